@@ -1,7 +1,6 @@
 from __future__ import annotations
 
-import random
-from typing import Optional, Tuple, TYPE_CHECKING
+from typing import Any, Optional, Tuple, TYPE_CHECKING
 
 import color
 import exceptions
@@ -90,11 +89,14 @@ class MeleeAction(ActionWithDirection):
 
         damage = self.entity.fighter.power - target.fighter.defense
 
+        # Message templates, filled in only if the log is displayed.
         if self.entity.equipment.melee is not None:
-            attack_desc = f"{self.entity.name.capitalize()} attacks {target.name} with {self.entity.equipment.melee.name}"
+            attack_desc = "{!c} attacks {} with {} for {} hit points."
+            attack_args: Tuple[Any, ...] = (self.entity.name, target.name, self.entity.equipment.melee.name)
             self.entity.equipment.melee.equippable.decrement_durability()
         else:
-            attack_desc = f"{self.entity.name.capitalize()} attacks {target.name}"
+            attack_desc = "{!c} attacks {} for {} hit points."
+            attack_args = (self.entity.name, target.name)
         if self.entity is self.engine.player:
             attack_color = color.player_atk
         else:
@@ -102,12 +104,12 @@ class MeleeAction(ActionWithDirection):
 
         if damage > 0:
             self.engine.message_log.add_message(
-                f"{attack_desc} for {damage} hit points.", attack_color
+                attack_desc, attack_color, args=(*attack_args, damage)
             )
             target.fighter.take_damage(damage)
         else:
             # self.engine.message_log.add_message(
-            #     f"{attack_desc} but does no damage.", attack_color
+            #     "{!c} attacks {} but does no damage.", attack_color, args=attack_args[:2]
             # )
             target.fighter.take_damage(1)
         if target.equipment.armor is not None:
@@ -193,26 +195,27 @@ class RangedAction(Action):
         else:
             jam_chance = 0.05
 
-        attack_desc = f"{self.entity.name.capitalize()} shoots at the {target.name}"
+        attack_args = (self.entity.name, target.name)
         if self.entity is self.engine.player:
             attack_color = color.player_atk
         else:
             attack_color = color.enemy_atk
-        if random.random() < jam_chance:
+        roll = self.engine.rng.combat
+        if roll.random() < jam_chance:
             self.entity.equipment.gun.equippable.jam()
             playaudio("audio/jam.wav")
-        elif random.random() < hit_chance:
+        elif roll.random() < hit_chance:
             self.entity.equipment.gun.equippable.decrement_ammo()
             damage = self.entity.fighter.ranged_power - target.fighter.defense
 
             if damage > 0:
                 self.engine.message_log.add_message(
-                    f"{attack_desc} for {damage} hit points.", attack_color
+                    "{!c} shoots at the {} for {} hit points.", attack_color, args=(*attack_args, damage)
                 )
                 target.fighter.take_damage(damage)
             else:
                 # self.engine.message_log.add_message(
-                #     f"{attack_desc} but does no damage.", attack_color
+                #     "{!c} shoots at the {} but does no damage.", attack_color, args=attack_args
                 # )
                 target.fighter.take_damage(1)
             if target.equipment.armor is not None:
@@ -221,7 +224,7 @@ class RangedAction(Action):
         else:
             self.entity.equipment.gun.equippable.decrement_ammo()
             self.engine.message_log.add_message(
-                f"{attack_desc} but misses!", attack_color
+                "{!c} shoots at the {} but misses!", attack_color, args=attack_args
             )
             playaudio("audio/jsfxr-shoot.wav")
         # self.entity.equipment.gun.equippable.decrement_durability()
@@ -238,19 +241,18 @@ class PickupAction(Action):
         actor_location_y = self.entity.y
         inventory = self.entity.inventory
 
-        for item in self.engine.game_map.items:
-            if actor_location_x == item.x and actor_location_y == item.y:
-                if len(inventory.items) >= inventory.capacity:
-                    playaudio("audio/jsfxr-error.wav")
-                    raise exceptions.Impossible("Your inventory is full.")
+        for item in self.engine.game_map.get_items_at_location(actor_location_x, actor_location_y):
+            if len(inventory.items) >= inventory.capacity:
+                playaudio("audio/jsfxr-error.wav")
+                raise exceptions.Impossible("Your inventory is full.")
 
-                self.engine.game_map.entities.remove(item)
-                item.parent = self.entity.inventory
-                inventory.items.append(item)
+            self.engine.game_map.remove_entity(item)
+            item.parent = self.entity.inventory
+            inventory.items.append(item)
 
-                self.engine.message_log.add_message(f"You took the {item.name}!")
-                playaudio("audio/jsfxr-pickup.wav")
-                return
+            self.engine.message_log.add_message("You took the {}!", args=(item.name,))
+            playaudio("audio/jsfxr-pickup.wav")
+            return
         playaudio("audio/jsfxr-error.wav")
         raise exceptions.Impossible("There is nothing here to take.")
 
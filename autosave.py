@@ -0,0 +1,117 @@
+"""Periodic saving in the background.
+
+The Engine is snapshotted on the main thread between turns, which only costs a pickle,
+then a worker thread compresses it and atomically replaces the save file.  The save being
+replaced is kept as a backup, see save_format.backup_filename.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import traceback
+from typing import Optional, TYPE_CHECKING
+
+import save_format
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+DEFAULT_INTERVAL = 50  # Turns between autosaves, besides the one on every new floor.
+
+
+class Autosaver:
+    def __init__(
+        self,
+        filename: str,
+        interval: int = DEFAULT_INTERVAL,
+        compression: str = save_format.DEFAULT_COMPRESSION,
+    ):
+        self.filename = filename
+        self.interval = interval
+        self.compression = compression
+
+        self.turns_since_save = 0
+        self.saves_written = 0
+        self.last_error: Optional[BaseException] = None
+
+        # Only the newest snapshot is kept, older ones waiting to be written are dropped.
+        self.pending: Optional[save_format.Snapshot] = None
+        self.busy = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+        self.thread.start()
+
+    def on_turn(self, engine: Engine, new_floor: bool = False) -> None:
+        """Called after every turn, requests a save every `interval` turns or on a new floor."""
+        if not engine.player.is_alive:
+            return  # A finished game shouldn't be saved.
+        self.turns_since_save += 1
+        if new_floor or self.turns_since_save >= self.interval:
+            self.request(engine)
+
+    def request(self, engine: Engine) -> None:
+        """Snapshot the engine now and write it out in the background."""
+        snapshot = save_format.snapshot(engine)
+        self.turns_since_save = 0
+        with self.condition:
+            self.pending = snapshot
+            self.condition.notify()
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.pending is None:
+                    return  # Closed with nothing left to write.
+                snapshot, self.pending = self.pending, None
+                self.busy = True
+            try:
+                save_format.write(snapshot, self.filename, self.compression)
+                self.saves_written += 1
+            except Exception as exc:  # Keep the game running, the backup is still there.
+                self.last_error = exc
+                traceback.print_exc(file=sys.stderr)
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.condition.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every requested save is written.  Returns False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: self.pending is None and not self.busy, timeout=timeout
+            )
+
+    def close(self, discard: bool = False) -> None:
+        """Stop the worker, after writing any pending save unless `discard` is True."""
+        with self.condition:
+            if discard:
+                self.pending = None
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+
+_autosaver: Optional[Autosaver] = None
+
+
+def get_autosaver() -> Optional[Autosaver]:
+    return _autosaver
+
+
+def set_autosaver(autosaver: Optional[Autosaver]) -> None:
+    """Replace the active autosaver, closing the previous one."""
+    global _autosaver
+    stop()
+    _autosaver = autosaver
+
+
+def stop(discard: bool = False) -> None:
+    """Close the active autosaver, if there is one."""
+    global _autosaver
+    if _autosaver is not None:
+        _autosaver.close(discard)
+        _autosaver = None
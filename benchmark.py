@@ -0,0 +1,284 @@
+"""Run the game loop headless and report how fast each phase of a turn is.
+
+Usage: python benchmark.py --turns 2000 --seed 1 --policy stairs
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+import tcod
+
+import playaudio
+
+# Install the silent backend before any game module is imported, so a benchmark never
+# opens an audio device, whatever the game modules do with sound at import time.
+playaudio.set_backend(playaudio.NullBackend())
+
+from actions import Action, BumpAction, PickupAction, TakeStairsAction, WaitAction
+import entity_factories
+import exceptions
+from message_log import Message
+import setup_game
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+screen_width = 80
+screen_height = 50
+
+DIRECTIONS = [(-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1)]
+
+
+class PhaseTimer:
+    """Accumulates wall clock timings for named phases of a turn."""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {}
+
+        self.turns = 0
+        self.elapsed = 0.0
+        self.floors = 0
+        self.deaths = 0
+        self.impossible = 0
+        self.fov_hits = 0
+        self.fov_misses = 0
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.samples.setdefault(phase, []).append(seconds)
+
+    def summary(self) -> str:
+        turns_per_second = self.turns / self.elapsed if self.elapsed else 0.0
+        return (
+            f"{self.turns} turns in {self.elapsed:.3f}s ({turns_per_second:.1f} turns/sec), "
+            f"{self.floors} floors descended, {self.deaths} deaths, {self.impossible} impossible actions, "
+            f"{self.fov_hits} FOV cache hits, {self.fov_misses} misses"
+        )
+
+    def add_engine_counters(self, engine: Engine) -> None:
+        """Collect the counters of an engine which is about to be discarded."""
+        self.fov_hits += engine.fov_cache.hits
+        self.fov_misses += engine.fov_cache.misses
+
+    def report(self) -> str:
+        lines = [f"{'phase':<16}{'calls':>8}{'total s':>10}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for phase, samples in self.samples.items():
+            millis = np.array(samples) * 1000
+            lines.append(
+                f"{phase:<16}{len(samples):>8}{millis.sum() / 1000:>10.3f}"
+                f"{millis.mean():>10.3f}{np.percentile(millis, 95):>10.3f}{millis.max():>10.3f}"
+            )
+        return "\n".join(lines)
+
+
+def random_policy(engine: Engine) -> Action:
+    """Bump in a random direction, with the occasional wait or pickup."""
+    player = engine.player
+    roll = random.random()
+    if roll < 0.05:
+        return WaitAction(player)
+    if roll < 0.1:
+        return PickupAction(player)
+    return BumpAction(player, *random.choice(DIRECTIONS))
+
+
+def stairs_policy(engine: Engine) -> Action:
+    """Fight anything adjacent, pick up items, otherwise head for the stairs."""
+    player = engine.player
+    game_map = engine.game_map
+
+    if (player.x, player.y) == game_map.downstairs_location:
+        return TakeStairsAction(player)
+
+    for dx, dy in DIRECTIONS:
+        if game_map.get_actor_at_location(player.x + dx, player.y + dy):
+            return BumpAction(player, dx, dy)
+
+    if any(game_map.get_items_at_location(player.x, player.y)):
+        if len(player.inventory.items) < player.inventory.capacity:
+            return PickupAction(player)
+
+    cost = np.array(game_map.tiles["walkable"], dtype=np.int8)
+    graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
+    pathfinder = tcod.path.Pathfinder(graph)
+    pathfinder.add_root((player.x, player.y))
+    path = pathfinder.path_to(game_map.downstairs_location)[1:].tolist()
+    if not path:
+        return random_policy(engine)
+    dest_x, dest_y = path[0]
+    return BumpAction(player, dest_x - player.x, dest_y - player.y)
+
+
+POLICIES: Dict[str, Callable[[Engine], Action]] = {
+    "random": random_policy,
+    "stairs": stairs_policy,
+}
+
+
+def new_engine(
+    timer: PhaseTimer,
+    map_size: Tuple[int, int] = (80, 43),
+    max_rooms: int = 30,
+    corpus_filename: Optional[str] = None,
+    activation_radius: Optional[int] = None,
+    spawn_tables_filename: Optional[str] = None,
+) -> Engine:
+    start = time.perf_counter()
+    engine = setup_game.new_game(
+        *map_size,
+        max_rooms=max_rooms,
+        corpus_filename=corpus_filename,
+        spawn_tables_filename=spawn_tables_filename,
+    )
+    if activation_radius is not None:
+        engine.activation_radius = activation_radius
+    timer.record("new game", time.perf_counter() - start)
+    return engine
+
+
+def run(
+    turns: int,
+    policy: Callable[[Engine], Action],
+    render: bool = True,
+    engine: Optional[Engine] = None,
+    map_size: Tuple[int, int] = (80, 43),
+    max_rooms: int = 30,
+    corpus_filename: Optional[str] = None,
+    activation_radius: Optional[int] = None,
+    spawn_tables_filename: Optional[str] = None,
+) -> PhaseTimer:
+    """Play `turns` turns using `policy` for the player and return the collected timings.
+
+    Mirrors EventHandler.handle_action, timing each phase separately.  A new game
+    is started whenever the player dies.
+    """
+    timer = PhaseTimer()
+    if engine is None:
+        engine = new_engine(
+            timer, map_size, max_rooms, corpus_filename, activation_radius, spawn_tables_filename
+        )
+    console = tcod.console.Console(screen_width, screen_height, order="F")
+
+    run_start = time.perf_counter()
+    while timer.turns < turns:
+        action = policy(engine)
+        phase = "floor generation" if isinstance(action, TakeStairsAction) else "player action"
+
+        start = time.perf_counter()
+        try:
+            action.perform()
+        except exceptions.Impossible:
+            timer.impossible += 1
+            timer.record(phase, time.perf_counter() - start)
+            continue  # Skip enemy turn on exceptions.
+        timer.record(phase, time.perf_counter() - start)
+        if phase == "floor generation":
+            timer.floors += 1
+
+        start = time.perf_counter()
+        engine.handle_enemy_turns()
+        timer.record("enemy ai", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        engine.update_fov()
+        timer.record("fov", time.perf_counter() - start)
+
+        if render:
+            start = time.perf_counter()
+            console.clear()
+            engine.render(console)
+            timer.record("render", time.perf_counter() - start)
+
+        timer.turns += 1
+        if not engine.player.is_alive:
+            timer.deaths += 1
+            timer.add_engine_counters(engine)
+            engine = new_engine(
+                timer, map_size, max_rooms, corpus_filename, activation_radius, spawn_tables_filename
+            )
+    timer.elapsed = time.perf_counter() - run_start
+    timer.add_engine_counters(engine)
+
+    return timer
+
+
+def measure_memory(count: int = 2000) -> str:
+    """Report the memory allocated per spawned actor, item and message."""
+    engine = setup_game.new_game()
+    lines = []
+    for name, make in [
+        ("actor", lambda: entity_factories.grunt.spawn(engine.game_map, 1, 1)),
+        ("item", lambda: entity_factories.pistol.spawn(engine.game_map, 1, 1)),
+        ("message", lambda: Message("Grunt attacks Player for 2 hit points.", (255, 255, 255))),
+    ]:
+        keep = []
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(count):
+            keep.append(make())
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        lines.append(f"{name:<16}{(after - before) / count:>10.0f} bytes each")
+    return "\n".join(lines)
+
+
+def measure_attribute_access(number: int = 1_000_000) -> str:
+    """Report how long reading common entity and component attributes takes."""
+    actor = entity_factories.grunt.clone()
+    lines = []
+    for name, statement in [
+        ("entity.x", "actor.x + actor.y"),
+        ("fighter.hp", "actor.fighter.hp"),
+        ("fighter.power", "actor.fighter.base_power"),
+    ]:
+        seconds = min(timeit.repeat(statement, globals={"actor": actor}, number=number, repeat=3))
+        lines.append(f"{name:<16}{seconds / number * 1e9:>10.1f} ns")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless turn-throughput benchmark.")
+    parser.add_argument("--turns", type=int, default=1000, help="Number of turns to play.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the player policy and the games played.")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="stairs")
+    parser.add_argument("--no-render", action="store_true", help="Skip the offscreen render phase.")
+    parser.add_argument("--map-width", type=int, default=80)
+    parser.add_argument("--map-height", type=int, default=43)
+    parser.add_argument("--max-rooms", type=int, default=30)
+    parser.add_argument("--corpus", help="Take floors from this corpus file, see corpus.py.")
+    parser.add_argument("--spawn-tables", help="Spawn entities from this JSON file, see spawn_table.py.")
+    parser.add_argument(
+        "--activation-radius", type=int, default=None, help="Enemies further from the player than this are dormant."
+    )
+    parser.add_argument(
+        "--micro", action="store_true", help="Also measure memory per entity and attribute access."
+    )
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    timer = run(
+        args.turns,
+        POLICIES[args.policy],
+        render=not args.no_render,
+        map_size=(args.map_width, args.map_height),
+        max_rooms=args.max_rooms,
+        corpus_filename=args.corpus,
+        activation_radius=args.activation_radius,
+        spawn_tables_filename=args.spawn_tables,
+    )
+    print(timer.summary())
+    print(timer.report())
+
+    if args.micro:
+        print(measure_memory())
+        print(measure_attribute_access())
+
+
+if __name__ == "__main__":
+    main()
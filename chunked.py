@@ -0,0 +1,252 @@
+"""Sparse 2D arrays stored as fixed-size chunks, for maps too large to allocate densely.
+
+A chunk is only allocated once something other than the fill value is written to it, so
+the solid rock between the rooms of a large floor costs nothing.  Indexing follows NumPy
+for the cases the game uses:
+
+    array[x, y]                  A single element.
+    array[x0:x1, y0:y1]          A dense copy of a window.
+    array[xs, ys]                Elements gathered from two integer arrays.
+    array["field"][...]          Any of the above, for one field of a structured dtype.
+
+Reads always return copies, `array[window] |= other` still works since Python writes the
+result back with __setitem__.
+
+Indexing a ChunkedArray is several times slower than indexing an ndarray, so new_array
+only chunks arrays larger than a few chunks.  argwhere and put work on either kind.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np  # type: ignore
+
+CHUNK_SIZE = 64
+# Arrays covering at most this many chunks are allocated densely by new_array.
+DENSE_CHUNKS = 16
+
+Index = Union[int, slice]
+
+
+class ChunkedArray:
+    def __init__(self, shape: Tuple[int, int], dtype: Any, fill_value: Any, chunk_size: int = CHUNK_SIZE):
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.dtype = np.dtype(dtype)
+        self.fill_value = np.array(fill_value, dtype=self.dtype)
+        self.chunk_size = chunk_size
+        self.chunks: Dict[Tuple[int, int], np.ndarray] = {}  # Keyed by chunk coordinates.
+        # Structured arrays are copied through this opaque dtype, NumPy copies them field by field otherwise.
+        self.raw_dtype = np.dtype((np.void, self.dtype.itemsize)) if self.dtype.fields else self.dtype
+        # Read in place of missing chunks, copying it is much faster than filling structured arrays.
+        self.fill_chunk = np.full((chunk_size, chunk_size), self.fill_value, order="F")
+
+    def __getstate__(self) -> dict:
+        """Leave fill_chunk out of save files."""
+        state = self.__dict__.copy()
+        del state["fill_chunk"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.fill_chunk = np.full((self.chunk_size, self.chunk_size), self.fill_value, order="F")
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the allocated chunks."""
+        return sum(chunk.nbytes for chunk in self.chunks.values())
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        """Return the whole array densely, this is slow for large maps."""
+        array = self[:, :]
+        return array if dtype is None else array.astype(dtype)
+
+    def _new_chunk(self) -> np.ndarray:
+        return self.fill_chunk.copy(order="F")
+
+    def _normalize(self, index: Any, axis: int) -> Index:
+        """Return a plain int or a step 1 slice clipped to the bounds of `axis`."""
+        size = self.shape[axis]
+        if isinstance(index, slice):
+            start, stop, step = index.indices(size)
+            if step != 1:
+                raise IndexError("Only slices with a step of 1 are supported.")
+            return slice(start, max(start, stop))
+        index = int(index)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(f"Index {index} is out of bounds for axis {axis} with size {size}.")
+        return index
+
+    def _spans(self, span: slice) -> Iterator[Tuple[int, int, int]]:
+        """Yield (chunk index, start, stop) for each chunk `span` overlaps."""
+        size = self.chunk_size
+        for chunk_index in range(span.start // size, (span.stop - 1) // size + 1):
+            yield chunk_index, max(span.start, chunk_index * size), min(span.stop, (chunk_index + 1) * size)
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, str):
+            return ChunkedField(self, key)
+        x, y = key
+        if isinstance(x, np.ndarray) or isinstance(y, np.ndarray):
+            return self._gather(np.asarray(x), np.asarray(y))
+        if type(x) is not int or type(y) is not int or x < 0 or y < 0:  # Skipped for speed otherwise.
+            x = self._normalize(x, 0)
+            y = self._normalize(y, 1)
+        if not isinstance(x, slice) and not isinstance(y, slice):
+            if x >= self.shape[0] or y >= self.shape[1]:
+                raise IndexError(f"Index {(x, y)} is out of bounds for shape {self.shape}.")
+            size = self.chunk_size
+            chunk = self.chunks.get((x // size, y // size))
+            if chunk is None:
+                return self.fill_value[()]
+            return chunk[x % size, y % size]
+
+        as_window = (
+            x if isinstance(x, slice) else slice(x, x + 1),
+            y if isinstance(y, slice) else slice(y, y + 1),
+        )
+        out = self._read(*as_window)
+        return out[
+            slice(None) if isinstance(x, slice) else 0,
+            slice(None) if isinstance(y, slice) else 0,
+        ]
+
+    def _read(self, xs: slice, ys: slice) -> np.ndarray:
+        out = np.empty((xs.stop - xs.start, ys.stop - ys.start), self.dtype, order="F")
+        raw_out = out.view(self.raw_dtype)
+        size = self.chunk_size
+        for cx, x0, x1 in self._spans(xs):
+            for cy, y0, y1 in self._spans(ys):
+                chunk = self.chunks.get((cx, cy), self.fill_chunk).view(self.raw_dtype)
+                raw_out[x0 - xs.start:x1 - xs.start, y0 - ys.start:y1 - ys.start] = (
+                    chunk[x0 - cx * size:x1 - cx * size, y0 - cy * size:y1 - cy * size]
+                )
+        return out
+
+    def _gather(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        xs, ys = np.broadcast_arrays(xs, ys)
+        out = np.full(xs.shape, self.fill_value)
+        if not xs.size:
+            return out
+        if xs.min() < 0 or ys.min() < 0 or xs.max() >= self.shape[0] or ys.max() >= self.shape[1]:
+            raise IndexError("Index out of bounds.")
+        size = self.chunk_size
+        chunk_x, chunk_y = xs // size, ys // size
+        for cx, cy in set(zip(chunk_x.ravel().tolist(), chunk_y.ravel().tolist())):
+            chunk = self.chunks.get((cx, cy))
+            if chunk is not None:
+                mask = (chunk_x == cx) & (chunk_y == cy)
+                out[mask] = chunk[xs[mask] % size, ys[mask] % size]
+        return out
+
+    def __setitem__(self, key: Tuple[Any, Any], value: Any) -> None:
+        x, y = key
+        if type(x) is not int or type(y) is not int or x < 0 or y < 0:  # Skipped for speed otherwise.
+            x = self._normalize(x, 0)
+            y = self._normalize(y, 1)
+        size = self.chunk_size
+        if not isinstance(x, slice) and not isinstance(y, slice):
+            if x >= self.shape[0] or y >= self.shape[1]:
+                raise IndexError(f"Index {(x, y)} is out of bounds for shape {self.shape}.")
+            chunk = self.chunks.get((x // size, y // size))
+            if chunk is None:
+                if value == self.fill_value:
+                    return
+                chunk = self.chunks[x // size, y // size] = self._new_chunk()
+            chunk[x % size, y % size] = value
+            return
+
+        xs = x if isinstance(x, slice) else slice(x, x + 1)
+        ys = y if isinstance(y, slice) else slice(y, y + 1)
+        shape = (xs.stop - xs.start, ys.stop - ys.start)
+        value = np.asarray(value, dtype=self.dtype)
+        is_scalar = value.ndim == 0
+        if not is_scalar and value.shape != shape:
+            value = np.broadcast_to(value.reshape(shape) if value.ndim < 2 else value, shape)
+        for cx, x0, x1 in self._spans(xs):
+            for cy, y0, y1 in self._spans(ys):
+                part = value if is_scalar else value[x0 - xs.start:x1 - xs.start, y0 - ys.start:y1 - ys.start]
+                chunk = self.chunks.get((cx, cy))
+                if chunk is None:
+                    if np.all(part == self.fill_value):
+                        continue  # Writing the fill value over nothing.
+                    chunk = self.chunks[cx, cy] = self._new_chunk()
+                chunk.view(self.raw_dtype)[x0 - cx * size:x1 - cx * size, y0 - cy * size:y1 - cy * size] = (
+                    part.view(self.raw_dtype)
+                )
+
+    def argwhere(self, field: Optional[str] = None) -> np.ndarray:
+        """Return the (x, y) indexes of the true elements, or of those where `field` is true.
+
+        Missing chunks are skipped, so this is cheap for sparse arrays unless the fill value
+        is true itself.
+        """
+        fill = self.fill_value[field] if field is not None else self.fill_value
+        if fill:
+            array = self[:, :]
+            return np.argwhere(array[field] if field is not None else array)
+        size = self.chunk_size
+        parts = [np.zeros((0, 2), dtype=np.intp)]
+        for (cx, cy), chunk in sorted(self.chunks.items()):
+            values = chunk[field] if field is not None else chunk
+            # Chunks on the edges are cut to the shape of the array.
+            values = values[:self.shape[0] - cx * size, :self.shape[1] - cy * size]
+            parts.append(np.argwhere(values) + (cx * size, cy * size))
+        return np.concatenate(parts)
+
+    def put(self, mask: np.ndarray, value: Any) -> None:
+        """Set every element where the dense boolean `mask` is True to `value`."""
+        size = self.chunk_size
+        raw_value = np.asarray(value, dtype=self.dtype).view(self.raw_dtype)
+        for cx in range(-(-self.shape[0] // size)):
+            for cy in range(-(-self.shape[1] // size)):
+                block = mask[cx * size:(cx + 1) * size, cy * size:(cy + 1) * size]
+                if not block.any():
+                    continue
+                chunk = self.chunks.get((cx, cy))
+                if chunk is None:
+                    chunk = self.chunks[cx, cy] = self._new_chunk()
+                chunk.view(self.raw_dtype)[:block.shape[0], :block.shape[1]][block] = raw_value
+
+
+class ChunkedField:
+    """A read-only view of one field of a structured ChunkedArray."""
+
+    def __init__(self, array: ChunkedArray, name: str):
+        self.array = array
+        self.name = name
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.array.shape
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.array[key][self.name]
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        array = self.array[:, :][self.name]
+        return array if dtype is None else array.astype(dtype)
+
+
+def new_array(shape: Tuple[int, int], dtype: Any, fill_value: Any) -> Union[np.ndarray, ChunkedArray]:
+    """Return a dense array filled with `fill_value`, or a ChunkedArray if it would cover more than DENSE_CHUNKS."""
+    chunk_count = -(-shape[0] // CHUNK_SIZE) * -(-shape[1] // CHUNK_SIZE)
+    if chunk_count <= DENSE_CHUNKS:
+        return np.full(shape, fill_value, dtype=dtype, order="F")
+    return ChunkedArray(shape, dtype, fill_value)
+
+
+def argwhere(array: Union[np.ndarray, ChunkedArray], field: Optional[str] = None) -> np.ndarray:
+    """Return the (x, y) indexes of the true elements of `array`, or of those where `field` is true."""
+    if isinstance(array, ChunkedArray):
+        return array.argwhere(field)
+    return np.argwhere(array[field] if field is not None else array)
+
+
+def put(array: Union[np.ndarray, ChunkedArray], mask: np.ndarray, value: Any) -> None:
+    """Set every element of `array` where the dense boolean `mask` is True to `value`."""
+    if isinstance(array, ChunkedArray):
+        array.put(mask, value)
+    else:
+        array[mask] = value
@@ -0,0 +1,44 @@
+"""Support for the classes which use __slots__, since a long run creates thousands of them."""
+from __future__ import annotations
+
+from typing import Any, Dict, Tuple, Type, TypeVar
+
+T = TypeVar("T", bound="Compact")
+
+_slot_names: Dict[type, Tuple[str, ...]] = {}
+
+
+def slot_names(cls: Type[Any]) -> Tuple[str, ...]:
+    """Return every slot defined by `cls` and its bases."""
+    if cls not in _slot_names:
+        names = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get("__slots__", ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            names.extend(name for name in slots if name not in ("__dict__", "__weakref__"))
+        _slot_names[cls] = tuple(names)
+    return _slot_names[cls]
+
+
+class Compact:
+    """Base class for slotted classes.
+
+    Subclasses must define __slots__, otherwise they quietly get a __dict__ again.  Pickle
+    saves and restores slots by itself, saves from before slots (instance dicts) don't load.
+    """
+
+    __slots__ = ()
+
+    def shallow_copy(self: T, exclude: Tuple[str, ...] = ("parent",)) -> T:
+        """Return a new instance sharing this one's attribute values, except those in `exclude`."""
+        cls = self.__class__
+        clone = cls.__new__(cls)
+        for name in slot_names(cls):
+            if name not in exclude and hasattr(self, name):
+                setattr(clone, name, getattr(self, name))
+        if hasattr(self, "__dict__"):
+            for name, value in self.__dict__.items():
+                if name not in exclude:
+                    setattr(clone, name, value)
+        return clone
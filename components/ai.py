@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import random
 from typing import List, Optional, Tuple, TYPE_CHECKING
 
 import numpy as np  # type: ignore
@@ -17,35 +16,54 @@ class BaseAI(Action):
     def perform(self) -> None:
         raise NotImplementedError()
 
+    def clone(self, entity: Actor) -> BaseAI:
+        """Return a copy of this AI which drives `entity` instead."""
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone.entity = entity
+        return clone
+
+    def catch_up(self, turns: int) -> None:
+        """Account for `turns` turns spent dormant, far from the player."""
+        pass
+
     def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
         """Compute and return a path to the target position.
 
         If there is no valid path then returns an empty list.
         """
-        # Copy the walkable array.
-        cost = np.array(self.entity.gamemap.tiles["walkable"], dtype=np.int8)
-
-        for entity in self.entity.gamemap.entities:
-            # Check that an enitiy blocks movement and the cost isn't zero (blocking.)
-            if entity.blocks_movement and cost[entity.x, entity.y]:
-                # Add to the cost of a blocked position.
-                # A lower number means more enemies will crowd behind each other in
-                # hallways.  A higher number means enemies will take longer paths in
-                # order to surround the player.
-                cost[entity.x, entity.y] += 10
-
-        # Create a graph from the cost array and pass that graph to a new pathfinder.
-        graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
+        start = self.engine.path_index(self.entity.x, self.entity.y)
+        dest = self.engine.path_index(dest_x, dest_y)
+        if start is None or dest is None:
+            return []  # Too far from the player to pathfind.
+
+        # Create a graph from the shared cost array and pass that graph to a new pathfinder.
+        graph = tcod.path.SimpleGraph(cost=self.engine.get_path_cost(), cardinal=2, diagonal=3)
         pathfinder = tcod.path.Pathfinder(graph)
 
-        pathfinder.add_root((self.entity.x, self.entity.y))  # Start position.
+        pathfinder.add_root(start)  # Start position.
 
-        # Compute the path to the destination and remove the starting point.
-        path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
+        # Compute the path to the destination, remove the starting point and convert back to map positions.
+        path: List[List[int]] = (pathfinder.path_to(dest)[1:] + self.engine.path_origin).tolist()
 
         # Convert from List[List[int]] to List[Tuple[int, int]].
         return [(index[0], index[1]) for index in path]
 
+    def get_path_to_player(self) -> List[Tuple[int, int]]:
+        """Return a path to the player by descending the engine's shared distance map.
+
+        If there is no valid path then returns an empty list.
+        """
+        pathfinder = self.engine.get_player_pathfinder()
+        start = self.engine.path_index(self.entity.x, self.entity.y)
+        if start is None:
+            return []  # Too far from the player to pathfind.
+
+        # Walk from this entity down to the player and remove the starting point.
+        path: List[List[int]] = (pathfinder.path_from(start)[1:] + self.engine.path_origin).tolist()
+
+        return [(index[0], index[1]) for index in path]
+
 class ConfusedEnemy(BaseAI):
     """
     A confused enemy will stumble around aimlessly for a given number of turns, then revert back to its previous AI.
@@ -60,16 +78,26 @@ class ConfusedEnemy(BaseAI):
         self.previous_ai = previous_ai
         self.turns_remaining = turns_remaining
 
+    def clone(self, entity: Actor) -> ConfusedEnemy:
+        clone = super().clone(entity)
+        if self.previous_ai:
+            clone.previous_ai = self.previous_ai.clone(entity)
+        return clone
+
+    def catch_up(self, turns: int) -> None:
+        # The confusion wears off while dormant too, it is reverted on the next turn.
+        self.turns_remaining = max(0, self.turns_remaining - turns)
+
     def perform(self) -> None:
         # Revert the AI back to the original state if the effect has run its course.
         if self.turns_remaining <= 0:
             self.engine.message_log.add_message(
-                f"The {self.entity.name} is no longer confused."
+                "The {} is no longer confused.", args=(self.entity.name,)
             )
             self.entity.ai = self.previous_ai
         else:
             # Pick a random direction
-            direction_x, direction_y = random.choice(
+            direction_x, direction_y = self.engine.rng.ai.choice(
                 [
                     (-1, -1),  # Northwest
                     (0, -1),  # North
@@ -93,6 +121,14 @@ class HostileEnemy(BaseAI):
         super().__init__(entity)
         self.path: List[Tuple[int, int]] = []
 
+    def clone(self, entity: Actor) -> HostileEnemy:
+        clone = super().clone(entity)
+        clone.path = list(self.path)
+        return clone
+
+    def catch_up(self, turns: int) -> None:
+        self.path = []  # Led to where the player was, long ago.
+
     def perform(self) -> None:
         target = self.engine.player
         dx = target.x - self.entity.x
@@ -103,7 +139,7 @@ class HostileEnemy(BaseAI):
             if distance <= 1:
                 return MeleeAction(self.entity, dx, dy).perform()
 
-            self.path = self.get_path_to(target.x, target.y)
+            self.path = self.get_path_to_player()
 
         if self.path:
             try:
@@ -120,10 +156,31 @@ class WanderingEnemy(BaseAI):
     def __init__(self, entity: Actor):
         super().__init__(entity)
         self.path: List[Tuple[int, int]] = []
+        self.goal: Optional[Tuple[int, int]] = None  # Where it is wandering to.
+        self.waited = False  # Whether it waited for the next step of its path to clear last turn.
 
         self.start_x = entity.x
         self.start_y = entity.y
 
+    def clone(self, entity: Actor) -> WanderingEnemy:
+        clone = super().clone(entity)
+        clone.path = list(self.path)
+        return clone
+
+    def catch_up(self, turns: int) -> None:
+        self.path = []  # Planned from a cost array of long ago, a new goal is picked.
+        self.goal = None
+
+    def is_open_step(self, x: int, y: int) -> bool:
+        """Return True if the entity can step onto (x, y) right now."""
+        game_map = self.engine.game_map
+        return (
+            max(abs(x - self.entity.x), abs(y - self.entity.y)) == 1
+            and game_map.in_bounds(x, y)
+            and game_map.tiles["walkable"][x, y]
+            and not game_map.blocked[x, y]
+        )
+
     def perform(self) -> None:
         target = self.engine.player
         dx = target.x - self.entity.x
@@ -134,31 +191,35 @@ class WanderingEnemy(BaseAI):
             if distance <= 1:
                 return MeleeAction(self.entity, dx, dy).perform()
 
-            self.path = self.get_path_to(target.x, target.y)
-
-        if self.path:
-            dest_x, dest_y = self.path.pop(0)
-        else:
-            goal_x = random.randint(0, self.engine.game_map.width)
-            goal_y = random.randint(0, self.engine.game_map.height)
-
-            while not (self.engine.game_map.in_bounds(goal_x, goal_y) and self.engine.game_map.tiles["walkable"][goal_x, goal_y] and not self.engine.game_map.get_blocking_entity_at_location(goal_x, goal_y)):
-                goal_x = random.randint(0, self.engine.game_map.width)
-                goal_y = random.randint(0, self.engine.game_map.height)
-
-            self.path = self.get_path_to(goal_x, goal_y)
+            # Chase the player, waiting for whatever is in the way rather than wandering off.
+            self.path = self.get_path_to_player()
+            self.goal = None
+            if not self.path or not self.is_open_step(*self.path[0]):
+                return WaitAction(self.entity).perform()
+        elif self.path and not self.is_open_step(*self.path[0]):
+            # Something is in the way, it usually moves on by itself, so wait for a turn before
+            # planning again.  The new plan keeps the goal and routes around what blocks.
+            if not self.waited:
+                self.waited = True
+                return WaitAction(self.entity).perform()
+            self.path = self.get_path_to(*self.goal) if self.goal is not None else []
+            if self.path and not self.is_open_step(*self.path[0]):
+                self.path = []  # No way around, pick another goal.
+        self.waited = False
+
+        if not self.path:
+            self.goal = self.engine.game_map.random_free_location(self.engine.rng.ai)
+            if self.goal is not None:
+                self.path = self.get_path_to(*self.goal)
+            if not self.path or not self.is_open_step(*self.path[0]):
+                # The goal is unreachable, is where we already stand, or the way there is
+                # blocked right away, try again next turn.
+                self.goal = None
+                self.path = []
+                return WaitAction(self.entity).perform()
 
-            dest_x, dest_y = self.path.pop(0)
+        dest_x, dest_y = self.path.pop(0)
 
         return MovementAction(
             self.entity, dest_x - self.entity.x, dest_y - self.entity.y,
         ).perform()
-
-
-
-
-
-
-
-
-
@@ -1,14 +1,20 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TypeVar, TYPE_CHECKING
+
+from compact import Compact
 
 if TYPE_CHECKING:
     from engine import Engine
     from entity import Entity
     from game_map import GameMap
 
+T = TypeVar("T", bound="BaseComponent")
+
+
+class BaseComponent(Compact):
+    __slots__ = ("parent",)
 
-class BaseComponent:
     entity: Entity  # Owning entity instance.
     parent: Entity  # Owning entity instance.
 
@@ -18,4 +24,11 @@ class BaseComponent:
 
     @property
     def engine(self) -> Engine:
-        return self.gamemap.engine
\ No newline at end of file
+        return self.gamemap.engine
+
+    def clone(self: T) -> T:
+        """Return a copy of this component without an owner, much cheaper than copy.deepcopy.
+
+        Subclasses holding mutable state must copy it themselves.
+        """
+        return self.shallow_copy()
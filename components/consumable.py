@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import winsound
 from typing import Optional, TYPE_CHECKING
 
 import actions
@@ -66,8 +65,9 @@ class TacticalFlashlightConsumable(Consumable):
             raise Impossible("You cannot flash yourself!")
 
         self.engine.message_log.add_message(
-            f"The eyes of the {target.name} look vacant, as it starts to stumble around!",
+            "The eyes of the {} look vacant, as it starts to stumble around!",
             color.status_effect_applied,
+            args=(target.name,),
         )
         target.ai = components.ai.ConfusedEnemy(
             entity=target, previous_ai=target.ai, turns_remaining=self.number_of_turns,
@@ -85,8 +85,9 @@ class HealingConsumable(Consumable):
 
         if amount_recovered > 0:
             self.engine.message_log.add_message(
-                f"You use the {self.parent.name}, and recover {amount_recovered} HP!",
+                "You use the {}, and recover {} HP!",
                 color.health_recovered,
+                args=(self.parent.name, amount_recovered),
             )
             self.consume()
         else:
@@ -117,7 +118,8 @@ class GrenadeDamageConsumable(Consumable):
         for actor in self.engine.game_map.actors:
             if actor.distance(*target_xy) <= self.radius:
                 self.engine.message_log.add_message(
-                    f"The {actor.name} is engulfed in a shrapnel explosion, taking {self.damage} damage!"
+                    "The {} is engulfed in a shrapnel explosion, taking {} damage!",
+                    args=(actor.name, self.damage),
                 )
                 actor.fighter.take_damage(self.damage)
                 targets_hit = True
@@ -146,7 +148,8 @@ class ShurikenDamageConsumable(Consumable):
 
         if target:
             self.engine.message_log.add_message(
-                f"You throw a shuriken at the {target.name} striking it for {self.damage} damage!"
+                "You throw a shuriken at the {} striking it for {} damage!",
+                args=(target.name, self.damage),
             )
             target.fighter.take_damage(self.damage)
             self.consume()
@@ -166,7 +169,7 @@ class AmmoConsumable(Consumable):
                 else:
                     consumer.equipment.gun.equippable.ammo += self.count
                 self.engine.message_log.add_message(
-                    f"You reloaded your {consumer.equipment.gun.name}!"
+                    "You reloaded your {}!", args=(consumer.equipment.gun.name,)
                 )
                 self.consume()
                 playaudio("audio/reload.wav")
@@ -10,6 +10,8 @@ if TYPE_CHECKING:
 
 
 class Equipment(BaseComponent):
+    __slots__ = ("melee", "gun", "armor")
+
     parent: Actor
 
     def __init__(self, melee: Optional[Item] = None, gun: Optional[Item] = None, armor: Optional[Item] = None):
@@ -82,12 +84,12 @@ class Equipment(BaseComponent):
 
     def unequip_message(self, item_name: str) -> None:
         self.parent.gamemap.engine.message_log.add_message(
-            f"You remove the {item_name}."
+            "You remove the {}.", args=(item_name,)
         )
 
     def equip_message(self, item_name: str) -> None:
         self.parent.gamemap.engine.message_log.add_message(
-            f"You equip the {item_name}."
+            "You equip the {}.", args=(item_name,)
         )
 
     def equip_to_slot(self, slot: str, item: Item, add_message: bool) -> None:
@@ -12,6 +12,20 @@ if TYPE_CHECKING:
 
 
 class Equippable(BaseComponent):
+    __slots__ = (
+        "equipment_type",
+        "power_bonus",
+        "ranged_bonus",
+        "defense_bonus",
+        "accuracy_bonus",
+        "durability",
+        "max_ammo",
+        "ammo",
+        "fully_accurate",
+        "unjammable",
+        "is_jammed",
+    )
+
     parent: Item
 
     def __init__(
@@ -56,53 +70,69 @@ class Equippable(BaseComponent):
         entity = self.parent
         inventory = entity.parent
         if isinstance(inventory, components.inventory.Inventory):
-            self.engine.message_log.add_message(f"Your {entity.name} breaks!", color.red)
+            self.engine.message_log.add_message("Your {} breaks!", color.red, args=(entity.name,))
             entity.parent.parent.equipment.unequip_from_slot(entity.equippable.equipment_type.name.lower(), False)
             inventory.items.remove(entity)
 
     def unjam(self):
         entity = self.parent
         self.is_jammed = False
-        self.engine.message_log.add_message(f"You carefully unjam your {entity.name}.")
+        self.engine.message_log.add_message("You carefully unjam your {}.", args=(entity.name,))
 
     def jam(self):
         entity = self.parent
         self.is_jammed = True
-        self.engine.message_log.add_message(f"Your {entity.name} jams!", color.red)
+        self.engine.message_log.add_message("Your {} jams!", color.red, args=(entity.name,))
 
 
 class BrassKnuckles(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=EquipmentType.MELEE, power_bonus=2, durability=10)
 
 class Knife(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=EquipmentType.MELEE, power_bonus=4, durability=15)
 
 
 class Pistol(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=EquipmentType.GUN, ranged_bonus=4, max_ammo=6, durability=24)
 
 class Rifle(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=EquipmentType.GUN, ranged_bonus=6, max_ammo=12, durability=36)
 
 
 class LightArmor(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=EquipmentType.ARMOR, defense_bonus=1, durability=10)
 
 class HeavyArmor(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=EquipmentType.ARMOR, defense_bonus=3, durability=15)
 
 # very overpowered weapons meant for debugging only (so that I don't have to get good at my own game to test it)
 class Lightsaber(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=EquipmentType.MELEE, power_bonus=9999, durability=9999)
 
 class BFG(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(
             equipment_type=EquipmentType.GUN,
@@ -113,5 +143,7 @@ class BFG(Equippable):
         )
 
 class PlotArmor(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=EquipmentType.ARMOR, defense_bonus=9999, durability=9999)
\ No newline at end of file
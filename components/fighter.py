@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import Tuple, TYPE_CHECKING
 
 import color
 from components.base_component import BaseComponent
@@ -12,6 +12,10 @@ if TYPE_CHECKING:
 
 
 class Fighter(BaseComponent):
+    __slots__ = (
+        "max_hp", "_hp", "base_defense", "base_power", "base_ranged_power", "base_accuracy"
+    )
+
     parent: Actor
 
     def __init__(
@@ -108,18 +112,20 @@ class Fighter(BaseComponent):
     def die(self) -> None:
         if self.engine.player is self.parent:
             death_message = "You died!"
+            death_message_args: Tuple[str, ...] = ()
             death_message_color = color.player_die
         else:
-            death_message = f"{self.parent.name} is dead!"
+            death_message = "{} is dead!"
+            death_message_args = (self.parent.name,)
             death_message_color = color.enemy_die
 
         self.parent.char = "%"
         self.parent.color = (191, 0, 0)
-        self.parent.blocks_movement = False
+        self.gamemap.set_blocks_movement(self.parent, False)
         self.parent.ai = None
         self.parent.name = f"remains of {self.parent.name}"
-        self.parent.render_order = RenderOrder.CORPSE
+        self.gamemap.set_render_order(self.parent, RenderOrder.CORPSE)
 
-        self.engine.message_log.add_message(death_message, death_message_color)
+        self.engine.message_log.add_message(death_message, death_message_color, args=death_message_args)
 
         self.engine.player.level.add_xp(self.parent.level.xp_given)
\ No newline at end of file
@@ -10,6 +10,8 @@ if TYPE_CHECKING:
 
 
 class Level(BaseComponent):
+    __slots__ = ("current_level", "current_xp", "level_up_base", "level_up_factor", "xp_given")
+
     parent: Actor
 
     def __init__(
@@ -40,11 +42,11 @@ class Level(BaseComponent):
 
         self.current_xp += xp
 
-        self.engine.message_log.add_message(f"You gain {xp} experience points.")
+        self.engine.message_log.add_message("You gain {} experience points.", args=(xp,))
 
         if self.requires_level_up:
             self.engine.message_log.add_message(
-                f"You advance to level {self.current_level + 1}!"
+                "You advance to level {}!", args=(self.current_level + 1,)
             )
 
     def increase_level(self) -> None:
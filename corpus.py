@@ -0,0 +1,276 @@
+"""Generate floors outside of a game and store them in a compact corpus file.
+
+Usage: python corpus.py --seeds 0 100 --depths 1 10 --output floors.corpus
+
+Floor `depth` of seed `seed` is the same floor a game started with that seed generates at
+that depth, given the same map settings.  A corpus file is laid out like a save file, see
+save_format.write_sectioned:
+
+    MAGIC, header offset (uint64), sections..., JSON header
+
+with these 64-byte aligned sections, which can be memory-mapped:
+
+    floors          floor_dt, one per floor.
+    tiles           uint8 (floors, width, height), indexes into tile_types.TILE_TYPES.
+    spawns          spawn_dt, the entities of every floor, grouped by floor.
+    spawn_offsets   int64 (floors + 1), where the spawns of each floor start in `spawns`.
+
+The header holds the map settings and the entity_factories names `spawns` kinds index into.
+
+GameWorld can draw its floors from a corpus instead of generating them, see Corpus.
+"""
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+import chunked
+from entity import Entity
+import entity_factories
+from game_map import GameMap
+import procgen
+import rng
+import save_format
+import tile_types
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+MAGIC = b"HCFLOOR\x01"
+VERSION = 2  # Bumped whenever generate_dungeon makes different floors for the same seed.
+
+floor_dt = np.dtype(
+    [
+        ("seed", np.int64),
+        ("depth", np.int32),
+        ("start", np.int32, 2),  # Where the player starts.
+        ("downstairs", np.int32, 2),
+    ]
+)
+
+spawn_dt = np.dtype([("x", np.int32), ("y", np.int32), ("kind", np.uint16)])
+
+# Every prototype which can be spawned, by name.  Spawned entities are matched back to their
+# prototype by name, which entity_factories keeps unique.
+PROTOTYPES: Dict[str, Entity] = {
+    name: value for name, value in sorted(vars(entity_factories).items()) if isinstance(value, Entity)
+}
+PROTOTYPE_NAMES = list(PROTOTYPES)
+_kind_by_entity_name = {entity.name: kind for kind, entity in enumerate(PROTOTYPES.values())}
+
+
+class MapSettings:
+    def __init__(
+        self,
+        map_width: int = 80,
+        map_height: int = 43,
+        max_rooms: int = 30,
+        room_min_size: int = 6,
+        room_max_size: int = 10,
+    ):
+        self.map_width = map_width
+        self.map_height = map_height
+        self.max_rooms = max_rooms
+        self.room_min_size = room_min_size
+        self.room_max_size = room_max_size
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, MapSettings) and vars(self) == vars(other)
+
+
+def tile_ids(game_map: GameMap) -> np.ndarray:
+    """Return the tiles of a map as indexes into tile_types.TILE_TYPES."""
+    raw_dtype = np.dtype((np.void, tile_types.tile_dt.itemsize))
+    tiles = np.asarray(game_map.tiles).view(raw_dtype)
+    ids = np.zeros(tiles.shape, dtype=np.uint8, order="F")
+    for tile_id, tile in enumerate(tile_types.TILE_TYPES.view(raw_dtype)):
+        ids[tiles == tile] = tile_id
+    return ids
+
+
+def generate_floor(seed: int, depth: int, settings: MapSettings) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Generate one floor, returning its floor_dt record, tile ids and spawn_dt array."""
+    streams = rng.RandomStreams(seed)
+    game_map = procgen.generate_dungeon(
+        max_rooms=settings.max_rooms,
+        room_min_size=settings.room_min_size,
+        room_max_size=settings.room_max_size,
+        map_width=settings.map_width,
+        map_height=settings.map_height,
+        engine=None,
+        floor_number=depth,
+        rng=streams.for_floor(rng.MAP, depth),
+        spawn_rng=streams.for_floor(rng.SPAWN, depth),
+    )
+    floor = np.array((seed, depth, game_map.player_start_location, game_map.downstairs_location), dtype=floor_dt)
+    spawns = np.array(
+        [(entity.x, entity.y, _kind_by_entity_name[entity.name]) for entity in game_map.entities],
+        dtype=spawn_dt,
+    )
+    return floor, tile_ids(game_map), spawns
+
+
+def generate_seed(args: Tuple[int, Sequence[int], MapSettings]) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Generate every depth of one seed, this runs in a worker process."""
+    seed, depths, settings = args
+    return [generate_floor(seed, depth, settings) for depth in depths]
+
+
+def write(
+    filename: str,
+    settings: MapSettings,
+    floors: np.ndarray,
+    tiles: np.ndarray,
+    spawns: np.ndarray,
+    spawn_offsets: np.ndarray,
+) -> None:
+    sections = [
+        (name, np.ascontiguousarray(array).tobytes())
+        for name, array in [
+            ("floors", floors),
+            ("tiles", tiles),
+            ("spawns", spawns),
+            ("spawn_offsets", spawn_offsets),
+        ]
+    ]
+    header = {
+        "version": VERSION,
+        "settings": vars(settings),
+        "floor_count": len(floors),
+        "prototypes": PROTOTYPE_NAMES,
+    }
+    with open(filename, "wb") as f:
+        save_format.write_sectioned(f, MAGIC, sections, header)
+
+
+def generate(
+    seeds: Sequence[int],
+    depths: Sequence[int],
+    settings: MapSettings,
+    filename: str,
+    workers: Optional[int] = None,
+) -> int:
+    """Generate every depth of every seed across a process pool and write them to `filename`.
+
+    Returns the number of floors written.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = [
+            floor
+            for seed_floors in executor.map(
+                generate_seed, [(seed, depths, settings) for seed in seeds], chunksize=4
+            )
+            for floor in seed_floors
+        ]
+
+    floors = np.array([floor for floor, _, _ in results], dtype=floor_dt)
+    tiles = np.array([floor_tiles for _, floor_tiles, _ in results], dtype=np.uint8)
+    spawn_counts = [len(floor_spawns) for _, _, floor_spawns in results]
+    spawn_offsets = np.concatenate([[0], np.cumsum(spawn_counts)]).astype(np.int64)
+    spawns = np.concatenate([floor_spawns for _, _, floor_spawns in results]) if results else np.zeros(0, spawn_dt)
+    write(filename, settings, floors, tiles, spawns, spawn_offsets)
+    return len(floors)
+
+
+class Corpus:
+    """A corpus file opened for reading.
+
+    The sections are memory-mapped, so opening a corpus reads nothing but its header and
+    building a floor only touches the pages of that floor.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            header = save_format.read_sectioned_header(f, MAGIC)
+        if header is None:
+            raise ValueError(f"{filename} is not a floor corpus.")
+        if header["version"] != VERSION:
+            raise ValueError(f"Unsupported corpus version {header['version']}.")
+
+        self.settings = MapSettings(**header["settings"])
+        count = header["floor_count"]
+        sections = {section["name"]: section for section in header["sections"]}
+
+        def section(name: str, dtype: np.dtype, shape: Tuple[int, ...]) -> np.ndarray:
+            if not count:
+                return np.zeros(shape, dtype=dtype)
+            return np.memmap(filename, dtype=dtype, mode="r", offset=sections[name]["offset"], shape=shape)
+
+        self.floors = section("floors", floor_dt, (count,))
+        self.tiles = section("tiles", np.uint8, (count, self.settings.map_width, self.settings.map_height))
+        self.spawn_offsets = section("spawn_offsets", np.int64, (count + 1,))
+        self.spawns = section("spawns", spawn_dt, (int(self.spawn_offsets[-1]) if count else 0,))
+        # Kinds in this file to the prototypes of this version of entity_factories.
+        self.prototypes = [PROTOTYPES[name] for name in header["prototypes"]]
+
+        # Floor indexes by (seed, depth), and by depth alone.
+        self.index: Dict[Tuple[int, int], int] = {}
+        self.depths: Dict[int, List[int]] = {}
+        for i, (seed, depth) in enumerate(zip(self.floors["seed"].tolist(), self.floors["depth"].tolist())):
+            self.index[seed, depth] = i
+            self.depths.setdefault(depth, []).append(i)
+
+    def find(self, seed: int, depth: int) -> Optional[int]:
+        """Return the index of the floor for `seed` at `depth`.
+
+        A floor of another seed is picked, the same one for every call, when the corpus
+        doesn't hold that seed.  Returns None if there are no floors of that depth.
+        """
+        if (seed, depth) in self.index:
+            return self.index[seed, depth]
+        candidates = self.depths.get(depth)
+        if not candidates:
+            return None
+        return rng.RandomStreams(seed).for_floor("corpus", depth).choice(candidates)
+
+    def build_floor(self, index: int, engine: Optional[Engine]) -> GameMap:
+        """Return a new GameMap holding floor `index`, spawning its entities."""
+        game_map = GameMap(engine, self.settings.map_width, self.settings.map_height)
+        tiles = self.tiles[index]
+        for tile_id in range(1, len(tile_types.TILE_TYPES)):  # The map is filled with walls already.
+            chunked.put(game_map.tiles, tiles == tile_id, tile_types.TILE_TYPES[tile_id])
+
+        floor = self.floors[index]
+        game_map.player_start_location = tuple(floor["start"].tolist())
+        game_map.downstairs_location = tuple(floor["downstairs"].tolist())
+        start, stop = self.spawn_offsets[index:index + 2].tolist()
+        for x, y, kind in self.spawns[start:stop].tolist():
+            self.prototypes[kind].spawn(game_map, x, y)
+        return game_map
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a corpus of floors.")
+    parser.add_argument("--seeds", type=int, nargs=2, default=[0, 100], metavar=("START", "STOP"),
+                        help="Generate the seeds in range(START, STOP).")
+    parser.add_argument("--depths", type=int, nargs=2, default=[1, 10], metavar=("FIRST", "LAST"),
+                        help="Generate these depths of every seed, both included.")
+    parser.add_argument("--output", default="floors.corpus")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, defaults to the CPU count.")
+    parser.add_argument("--map-width", type=int, default=80)
+    parser.add_argument("--map-height", type=int, default=43)
+    parser.add_argument("--max-rooms", type=int, default=30)
+    args = parser.parse_args()
+
+    settings = MapSettings(map_width=args.map_width, map_height=args.map_height, max_rooms=args.max_rooms)
+    start = time.perf_counter()
+    count = generate(
+        range(*args.seeds), range(args.depths[0], args.depths[1] + 1), settings, args.output, args.workers
+    )
+    elapsed = time.perf_counter() - start
+
+    size = os.path.getsize(args.output)
+    print(
+        f"{count} floors in {elapsed:.2f}s ({count / elapsed:.1f} floors/sec), "
+        f"{size / 1024:.0f} KiB ({size / max(count, 1):.0f} bytes per floor) written to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,153 @@
 from __future__ import annotations
 
-import lzma
-import pickle
-from typing import TYPE_CHECKING
+from typing import Optional, Tuple, TYPE_CHECKING
 
+import numpy as np  # type: ignore
 from tcod.console import Console
-from tcod.map import compute_fov
+from tcod.path import Pathfinder, SimpleGraph
 
 import color
 import exceptions
+from fov import FovCache, window_around
 import playaudio
 from message_log import MessageLog
 import render_functions
+from rng import RandomStreams
+import save_format
+from scheduler import action_time
 
 if TYPE_CHECKING:
     from entity import Actor
     from game_map import GameMap, GameWorld
 
+# The part of the screen the map is drawn on, larger maps scroll to follow the player.
+VIEWPORT_WIDTH = 80
+VIEWPORT_HEIGHT = 43
+
+# Enemies only pathfind within this many tiles of the player, so their cost doesn't grow
+# with the size of the map.
+PATH_RADIUS = 80
+# Enemies further than this from the player are dormant, they don't act until the player
+# comes close again.  Those beyond PATH_RADIUS couldn't go anywhere anyway.
+ACTIVATION_RADIUS = PATH_RADIUS
+
 
 class Engine:
     game_map: GameMap
     game_world: GameWorld
 
-    def __init__(self, player: Actor):
+    def __init__(self, player: Actor, seed: Optional[int] = None):
         self.message_log = MessageLog()
         self.mouse_location = (0, 0)
         self.player = player
+        self.rng = RandomStreams(seed)  # Saved with the game, so a loaded game carries on the same.
+        self.fov_cache = FovCache()
+        self.activation_radius = ACTIVATION_RADIUS
+
+        # Pathfinding data shared by every enemy, only valid during handle_enemy_turns.
+        # path_cost covers the window around the player which starts at path_origin.
+        self.path_cost: Optional[np.ndarray] = None
+        self.path_origin = (0, 0)
+        self.player_pathfinder: Optional[Pathfinder] = None
 
     def handle_enemy_turns(self) -> None:
-        for entity in set(self.game_map.actors) - {self.player}:
-            if entity.ai:
+        """Let every actor act whose turn comes up while the player takes theirs.
+
+        Actors are taken from the map's scheduler in a fixed order, so the AI draws from its
+        random stream reproducibly.  Those further than activation_radius from the player go
+        dormant instead of acting, and dormant actors within it are woken first.
+        """
+        game_map = self.game_map
+        x, y = self.player.x, self.player.y
+        radius = self.activation_radius
+        game_map.wake_actors_near(x, y, radius)
+        try:
+            for entity in game_map.scheduler.advance(action_time(self.player)):
+                if max(abs(entity.x - x), abs(entity.y - y)) > radius:
+                    game_map.make_dormant(entity)
+                    continue
                 try:
-                    entity.ai.perform()
+                    entity.ai.perform()  # type: ignore
                 except exceptions.Impossible:
                     pass  # Ignore impossible action exceptions from AI.
+        finally:
+            # Entities will have moved by next turn, and pathfinders can't be pickled.
+            self.path_cost = None
+            self.player_pathfinder = None
+
+    def get_path_cost(self) -> np.ndarray:
+        """Return the movement cost array for enemy pathfinding this turn.
+
+        Built once per enemy turn from the walkable tiles and the blocked array within
+        PATH_RADIUS of the player, use path_index to find positions in it.
+        """
+        if self.path_cost is None:
+            window = window_around(self.game_map, (self.player.x, self.player.y), PATH_RADIUS)
+            walkable = self.game_map.tiles["walkable"][window]
+            cost = np.array(walkable, dtype=np.int8)
+            # Add to the cost of a blocked position.
+            # A lower number means more enemies will crowd behind each other in
+            # hallways.  A higher number means enemies will take longer paths in
+            # order to surround the player.
+            cost[self.game_map.blocked[window] & walkable] += 10
+            self.path_cost = cost
+            self.path_origin = (window[0].start, window[1].start)
+        return self.path_cost
+
+    def path_index(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+        """Return the index of a map position in the path cost array, or None if it is outside."""
+        cost = self.get_path_cost()
+        index_x = x - self.path_origin[0]
+        index_y = y - self.path_origin[1]
+        if 0 <= index_x < cost.shape[0] and 0 <= index_y < cost.shape[1]:
+            return index_x, index_y
+        return None
+
+    def get_player_pathfinder(self) -> Pathfinder:
+        """Return a Dijkstra pathfinder rooted at the player, shared by every enemy this turn.
+
+        Distances are only resolved as far as the enemies asking for paths need them.
+        """
+        if self.player_pathfinder is None:
+            graph = SimpleGraph(cost=self.get_path_cost(), cardinal=2, diagonal=3)
+            self.player_pathfinder = Pathfinder(graph)
+            self.player_pathfinder.add_root(self.path_index(self.player.x, self.player.y))
+        return self.player_pathfinder
+
+    @property
+    def camera(self) -> Tuple[int, int]:
+        """The map position drawn at the top left corner of the screen."""
+        return self.game_map.get_camera(self.player.x, self.player.y, VIEWPORT_WIDTH, VIEWPORT_HEIGHT)
+
+    def screen_to_map(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+        """Return the map position drawn at a screen tile, or None if no map is drawn there."""
+        if not (0 <= x < VIEWPORT_WIDTH and 0 <= y < VIEWPORT_HEIGHT):
+            return None
+        camera_x, camera_y = self.camera
+        if not self.game_map.in_bounds(x + camera_x, y + camera_y):
+            return None
+        return x + camera_x, y + camera_y
+
+    def map_to_screen(self, x: int, y: int) -> Tuple[int, int]:
+        """Return the screen tile a map position is drawn at, which may be off screen."""
+        camera_x, camera_y = self.camera
+        return x - camera_x, y - camera_y
 
     def update_fov(self) -> None:
         """Recompute the visible area based on the players point of view."""
-        self.game_map.visible[:] = compute_fov(
-            self.game_map.tiles["transparent"],
-            (self.player.x, self.player.y),
-            radius=8,
-        )
+        game_map = self.game_map
+        window, visible = self.fov_cache.get(game_map, (self.player.x, self.player.y))
+        if window == game_map.visible_window and np.array_equal(visible, game_map.visible[window]):
+            return  # Nothing new to see, and the map can keep its composed tiles.
+        game_map.visible[game_map.visible_window] = False
+        game_map.visible[window] = visible
+        game_map.visible_window = window
         # If a tile is "visible" it should be added to "explored".
-        self.game_map.explored |= self.game_map.visible #.tiles["transparent"] TODO to see all rooms
+        game_map.explored[window] |= visible #.tiles["transparent"] TODO to see all rooms
+        game_map.invalidate_tile_layer()
 
     def render(self, console: Console) -> None:
-        self.game_map.render(console)
+        self.game_map.render(console, self.camera, VIEWPORT_WIDTH, VIEWPORT_HEIGHT)
 
         self.message_log.render(console=console, x=21, y=45, width=40, height=5)
 
@@ -83,8 +184,6 @@ class Engine:
             console=console, x=21, y=44, engine=self
         )
 
-    def save_as(self, filename: str) -> None:
-        """Save this Engine instance as a compressed file."""
-        save_data = lzma.compress(pickle.dumps(self))
-        with open(filename, "wb") as f:
-            f.write(save_data)
+    def save_as(self, filename: str, compression: str = save_format.DEFAULT_COMPRESSION) -> float:
+        """Save this Engine instance as a save file.  Returns the seconds it took."""
+        return save_format.save(self, filename, compression)
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-import copy
 import math
 from typing import Optional, Tuple, Type, TypeVar, TYPE_CHECKING, Union
 
+from compact import Compact
 from render_order import RenderOrder
+from scheduler import NORMAL_SPEED
 
 if TYPE_CHECKING:
     from components.ai import BaseAI
@@ -19,11 +20,13 @@ if TYPE_CHECKING:
 T = TypeVar("T", bound="Entity")
 
 
-class Entity:
+class Entity(Compact):
     """
     A generic object to represent players, enemies, items, etc.
     """
 
+    __slots__ = ("parent", "x", "y", "char", "color", "name", "blocks_movement", "render_order")
+
     parent: Union[GameMap, Inventory]
 
     def __init__(
@@ -47,30 +50,41 @@ class Entity:
         if parent:
             # If parent isn't provided now then it will be set later.
             self.parent = parent
-            parent.entities.add(self)
+            parent.add_entity(self)
 
     @property
     def gamemap(self) -> GameMap:
         return self.parent.gamemap
 
+    def clone(self: T) -> T:
+        """Return a copy of this entity with its own components, not yet placed anywhere.
+
+        Entities in entity_factories are prototypes, this is how new ones are made from them.
+        """
+        return self.shallow_copy()
+
     def spawn(self: T, gamemap: GameMap, x: int, y: int) -> T:
         """Spawn a copy of this instance at the given location."""
-        clone = copy.deepcopy(self)
+        clone = self.clone()
         clone.x = x
         clone.y = y
         clone.parent = gamemap
-        gamemap.entities.add(clone)
+        gamemap.add_entity(clone)
         return clone
 
     def place(self, x: int, y: int, gamemap: Optional[GameMap] = None) -> None:
         """Place this entity at a new location.  Handles moving across GameMaps."""
-        self.x = x
-        self.y = y
         if gamemap:
             if hasattr(self, "parent"):  # Possibly uninitialized.
-                if self.parent is self.gamemap:
-                    self.gamemap.entities.remove(self)
+                if self.parent is self.gamemap and self.parent is not gamemap:
+                    self.gamemap.remove_entity(self)
             self.parent = gamemap
+        if hasattr(self, "parent") and self.parent is self.gamemap:
+            # Keep the map's location index in sync.
+            self.gamemap.place_entity(self, x, y)
+        else:
+            self.x = x
+            self.y = y
 
     def distance(self, x: int, y: int) -> float:
         """
@@ -80,11 +94,12 @@ class Entity:
 
     def move(self, dx: int, dy: int) -> None:
         # Move the entity by a given amount
-        self.x += dx
-        self.y += dy
+        self.place(self.x + dx, self.y + dy)
 
 
 class Actor(Entity):
+    __slots__ = ("ai", "equipment", "fighter", "inventory", "level", "speed")
+
     def __init__(
         self,
         *,
@@ -98,6 +113,7 @@ class Actor(Entity):
         fighter: Fighter,
         inventory: Inventory,
         level: Level,
+        speed: int = NORMAL_SPEED,
     ):
         super().__init__(
             x=x,
@@ -123,12 +139,42 @@ class Actor(Entity):
         self.level = level
         self.level.parent = self
 
+        # Actions per turn relative to NORMAL_SPEED, see scheduler.py.
+        self.speed = speed
+
     @property
     def is_alive(self) -> bool:
         """Returns True as long as this actor can perform actions."""
         return bool(self.ai)
 
+    def clone(self) -> Actor:
+        clone = super().clone()
+
+        clone.ai = self.ai.clone(clone) if self.ai else None
+
+        clone.fighter = self.fighter.clone()
+        clone.fighter.parent = clone
+
+        clone.inventory = self.inventory.clone()
+        clone.inventory.parent = clone
+
+        clone.level = self.level.clone()
+        clone.level.parent = clone
+
+        # Equipped items live in the inventory, so point the slots at their clones.
+        item_clones = dict(zip(map(id, self.inventory.items), clone.inventory.items))
+        clone.equipment = self.equipment.clone()
+        clone.equipment.parent = clone
+        for slot in ("melee", "gun", "armor"):
+            item = getattr(self.equipment, slot)
+            if item is not None:
+                setattr(clone.equipment, slot, item_clones.get(id(item)) or item.clone())
+
+        return clone
+
 class Item(Entity):
+    __slots__ = ("consumable", "equippable")
+
     def __init__(
             self,
             *,
@@ -158,4 +204,17 @@ class Item(Entity):
         self.equippable = equippable
 
         if self.equippable:
-            self.equippable.parent = self
\ No newline at end of file
+            self.equippable.parent = self
+
+    def clone(self) -> Item:
+        clone = super().clone()
+
+        if self.consumable:
+            clone.consumable = self.consumable.clone()
+            clone.consumable.parent = clone
+
+        if self.equippable:
+            clone.equippable = self.equippable.clone()
+            clone.equippable.parent = clone
+
+        return clone
@@ -40,9 +40,10 @@ brute = Actor(
     inventory=Inventory(capacity=0),
     level=Level(xp_given=100),
 )
+_marvin_rng = random.Random("marvin")  # Seeded, so his color is the same in every game.
 marvin = Actor(
     char="M",
-    color=(random.randint(0, 255), random.randint(0, 255), random.randint(0, 255)),
+    color=(_marvin_rng.randint(0, 255), _marvin_rng.randint(0, 255), _marvin_rng.randint(0, 255)),
     name="Marvin",
     ai_cls=WanderingEnemy,
     equipment=Equipment(),
@@ -0,0 +1,103 @@
+"""Field of view computation, with a cache of recent results.
+
+Only the (2 * radius + 1) square window around the origin is ever passed to compute_fov,
+nothing outside of it can be seen, so the cost doesn't grow with the size of the map.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Optional, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+from tcod.map import compute_fov
+
+if TYPE_CHECKING:
+    from game_map import GameMap
+
+FOV_RADIUS = 8
+DEFAULT_CACHE_SIZE = 16
+
+FovKey = Tuple[Tuple[int, int], int]  # Origin, radius.
+Window = Tuple[slice, slice]
+
+
+def window_around(game_map: GameMap, origin: Tuple[int, int], radius: int) -> Window:
+    """Return the slices of `game_map` within `radius` tiles of `origin`."""
+    x, y = origin
+    return (
+        slice(max(0, x - radius), min(game_map.width, x + radius + 1)),
+        slice(max(0, y - radius), min(game_map.height, y + radius + 1)),
+    )
+
+
+def compute_fov_window(
+    game_map: GameMap, origin: Tuple[int, int], radius: int = FOV_RADIUS
+) -> Tuple[Window, np.ndarray]:
+    """Compute the FOV from `origin`, returning its window and what is visible inside it."""
+    window = window_around(game_map, origin, radius)
+    x, y = origin
+    visible = compute_fov(
+        game_map.tiles["transparent"][window],
+        (x - window[0].start, y - window[1].start),
+        radius=radius,
+    )
+    return window, visible
+
+
+class FovCache:
+    """The most recently computed fields of view of one GameMap.
+
+    Results are reused while the map and the origin are the same, tiles don't change once a
+    map is played on.  The least recently used result is dropped once there are more than
+    `max_size`.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self.game_map: Optional[GameMap] = None
+        self.entries: OrderedDict[FovKey, Tuple[Window, np.ndarray]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self) -> dict:
+        """Leave the cached results out of save files."""
+        state = self.__dict__.copy()
+        state["game_map"] = None
+        state["entries"] = OrderedDict()
+        return state
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def get(
+        self, game_map: GameMap, origin: Tuple[int, int], radius: int = FOV_RADIUS
+    ) -> Tuple[Window, np.ndarray]:
+        """Return the FOV window around `origin` and the tiles visible in it.
+
+        Results are computed if they aren't cached.  The returned array is read-only since
+        it is shared with later calls.
+        """
+        if game_map is not self.game_map:  # A new floor, nothing cached applies.
+            self.clear()
+            self.game_map = game_map
+
+        key = (origin, radius)
+        result = self.entries.get(key)
+        if result is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return result
+
+        self.misses += 1
+        result = compute_fov_window(game_map, origin, radius)
+        result[1].flags.writeable = False
+        self.entries[key] = result
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return result
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -1,16 +1,41 @@
 from __future__ import annotations
 
-from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+import random
+import sys
+import threading
+import traceback
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
 
 import numpy as np  # type: ignore
 from tcod.console import Console
 
+import chunked
 from entity import Actor, Item
+from playaudio import playaudio
+from render_order import RenderOrder
+import rng
+from scheduler import DormantActors, TURN_TIME, TurnScheduler
 import tile_types
 
 if TYPE_CHECKING:
+    from corpus import Corpus
     from engine import Engine
     from entity import Entity
+    from spawn_table import SpawnTables
+
+# How an entity is drawn, GameMap keeps one of these per entity so they can be drawn at once.
+entity_graphic_dt = np.dtype(
+    [
+        ("x", np.int32),
+        ("y", np.int32),
+        ("ch", np.int32),  # Unicode codepoint.
+        ("fg", "3B"),  # 3 unsigned bytes, for RGB colors.
+        ("render_order", np.int32),
+    ]
+)
+
+# Random tiles random_free_location tries before it filters out the blocked ones.
+FREE_LOCATION_DRAWS = 8
 
 
 class GameMap:
@@ -19,22 +44,60 @@ class GameMap:
     ):
         self.engine = engine
         self.width, self.height = width, height
-        self.entities = set(entities)
-        self.tiles = np.full((width, height), fill_value=tile_types.wall, order="F")
+        self.entities: Dict[Entity, None] = {}  # Used as a set which keeps the order entities were added in.
+        # When each actor other than the player acts next, see handle_enemy_turns.
+        self.scheduler = TurnScheduler()
+        self.dormant = DormantActors()  # Actors too far from the player to be scheduled.
+        # The map arrays of large floors are chunked, so only the parts which were dug out use
+        # memory, see chunked.new_array.  Tiles don't change once the map is played on, cached
+        # FOVs and walkable_locations rely on it.
+        self.tiles = chunked.new_array((width, height), tile_types.tile_dt, fill_value=tile_types.wall)
+
+        # Entities keyed by the tile they stand on, kept in sync by add/remove/place_entity.
+        self.entities_by_location: Dict[Tuple[int, int], List[Entity]] = {}
+        self.blocked = chunked.new_array(
+            (width, height), bool, fill_value=False
+        )  # Tiles occupied by an entity which blocks movement
+        # Graphics of every entity, the first len(self.entities) rows are in use.
+        self.entity_graphics = np.zeros(16, dtype=entity_graphic_dt)
+        self.entity_graphic_rows: Dict[Entity, int] = {}  # Entity to its row in entity_graphics.
+        self.entity_graphic_owners: List[Entity] = []  # Row in entity_graphics to its entity.
 
-        self.visible = np.full(
-            (width, height), fill_value=False, order="F"
+        self.visible = chunked.new_array(
+            (width, height), bool, fill_value=False
         )  # Tiles the player can currently see
-        self.explored = np.full(
-            (width, height), fill_value=False, order="F"
+        # The part of self.visible which may be True, everything outside of it is False.
+        self.visible_window: Tuple[slice, slice] = (slice(0, width), slice(0, height))
+        self.explored = chunked.new_array(
+            (width, height), bool, fill_value=False
         )  # Tiles the player has seen before
 
+        # The composed light/dark/shroud graphics of the tiles on screen, None when they need
+        # to be recomposed.  tile_layer_window is the part of the map they were composed from,
+        # and tile_layer_visible is the visible array within it.
+        self.tile_layer: Optional[np.ndarray] = None
+        self.tile_layer_window: Optional[Tuple[slice, slice]] = None
+        self.tile_layer_visible: Optional[np.ndarray] = None
+        # The (x, y) of every walkable tile, None until asked for.
+        self.walkable_locations: Optional[np.ndarray] = None
+
+        self.player_start_location = (0, 0)
         self.downstairs_location = (0, 0)
 
+        for entity in entities:
+            self.add_entity(entity)
+
     @property
     def gamemap(self) -> GameMap:
         return self
 
+    def __getstate__(self) -> dict:
+        """Leave the render cache and the walkable locations out of save files."""
+        state = self.__dict__.copy()
+        state["tile_layer"] = None
+        state["tile_layer_visible"] = None
+        state["walkable_locations"] = None
+        return state
 
     @property
     def actors(self) -> Iterator[Actor]:
@@ -49,54 +112,240 @@ class GameMap:
     def items(self) -> Iterator[Item]:
         yield from (entity for entity in self.entities if isinstance(entity, Item))
 
+    def add_entity(self, entity: Entity) -> None:
+        """Add an entity to this map at its current location."""
+        if entity in self.entities:
+            return
+        self.entities[entity] = None
+        location = (entity.x, entity.y)
+        self.entities_by_location.setdefault(location, []).append(entity)
+        self.update_blocked(*location)
+        if isinstance(entity, Actor):
+            self.schedule_actor(entity)
+
+        row = len(self.entity_graphic_rows)
+        if row == len(self.entity_graphics):
+            self.entity_graphics = np.resize(self.entity_graphics, row * 2)
+        self.entity_graphic_rows[entity] = row
+        self.entity_graphic_owners.append(entity)
+        self.update_entity_graphic(entity)
+
+    def remove_entity(self, entity: Entity) -> None:
+        """Remove an entity from this map, if it is on it."""
+        if entity not in self.entities:
+            return
+        del self.entities[entity]
+        if isinstance(entity, Actor):
+            self.scheduler.remove(entity)
+            self.dormant.remove(entity)
+        location = (entity.x, entity.y)
+        entities_here = self.entities_by_location[location]
+        entities_here.remove(entity)
+        if not entities_here:
+            del self.entities_by_location[location]
+        self.update_blocked(*location)
+
+        # Fill the hole with the last row so the rows in use stay contiguous.
+        row = self.entity_graphic_rows.pop(entity)
+        last_entity = self.entity_graphic_owners.pop()
+        if last_entity is not entity:
+            self.entity_graphics[row] = self.entity_graphics[len(self.entity_graphic_owners)]
+            self.entity_graphic_rows[last_entity] = row
+            self.entity_graphic_owners[row] = last_entity
+
+    def schedule_actor(self, actor: Actor) -> None:
+        """Queue a living actor other than the player to act, if it isn't queued yet."""
+        if actor.is_alive and (self.engine is None or actor is not self.engine.player):
+            self.scheduler.add(actor)
+
+    def make_dormant(self, actor: Actor) -> None:
+        """Stop scheduling an actor until wake_actors_near wakes it."""
+        self.scheduler.remove(actor)
+        self.dormant.add(actor, self.scheduler.time)
+
+    def wake_actors_near(self, x: int, y: int, radius: int) -> None:
+        """Schedule the dormant actors within `radius` tiles of (x, y) again.
+
+        Each one's AI first catches up on the turns it slept through.
+        """
+        for actor, since in self.dormant.pop_near(x, y, radius):
+            if actor.ai:
+                actor.ai.catch_up((self.scheduler.time - since) // TURN_TIME)
+                self.schedule_actor(actor)
+
+    def place_entity(self, entity: Entity, x: int, y: int) -> None:
+        """Move an entity to a new location on this map, adding it if needed."""
+        if entity not in self.entities:
+            entity.x = x
+            entity.y = y
+            self.add_entity(entity)
+            return
+
+        old_location = (entity.x, entity.y)
+        entities_here = self.entities_by_location[old_location]
+        entities_here.remove(entity)
+        if not entities_here:
+            del self.entities_by_location[old_location]
+
+        entity.x = x
+        entity.y = y
+        self.entities_by_location.setdefault((x, y), []).append(entity)
+        self.update_blocked(*old_location)
+        self.update_blocked(x, y)
+
+        row = self.entity_graphics[self.entity_graphic_rows[entity]]
+        row["x"] = x
+        row["y"] = y
+
+    def set_blocks_movement(self, entity: Entity, blocks_movement: bool) -> None:
+        """Change whether an entity blocks movement, keeping the blocked array in sync."""
+        entity.blocks_movement = blocks_movement
+        if entity in self.entities:
+            self.update_blocked(entity.x, entity.y)
+
+    def set_render_order(self, entity: Entity, render_order: RenderOrder) -> None:
+        """Change the render order of an entity, keeping entity_graphics in sync."""
+        entity.render_order = render_order
+        self.update_entity_graphic(entity)
+
+    def update_entity_graphic(self, entity: Entity) -> None:
+        """Copy the position, char, color and render order of an entity into entity_graphics.
+
+        Call this after changing how an entity looks.
+        """
+        if entity not in self.entity_graphic_rows:
+            return
+        self.entity_graphics[self.entity_graphic_rows[entity]] = (
+            entity.x, entity.y, ord(entity.char), entity.color, entity.render_order.value
+        )
+
+    def get_walkable_locations(self) -> np.ndarray:
+        """Return the (x, y) of every walkable tile as an (n, 2) array, it must not be modified."""
+        if self.walkable_locations is None:
+            self.walkable_locations = chunked.argwhere(self.tiles, "walkable")
+        return self.walkable_locations
+
+    def random_free_location(self, rng: random.Random) -> Optional[Tuple[int, int]]:
+        """Return a random walkable tile no entity blocks, or None if there are none."""
+        locations = self.get_walkable_locations()
+        if not len(locations):
+            return None
+        # Few tiles are blocked, so a draw is nearly always free.
+        for _ in range(FREE_LOCATION_DRAWS):
+            x, y = locations[rng.randrange(len(locations))].tolist()
+            if not self.blocked[x, y]:
+                return x, y
+        # Crowded, draw from the tiles which aren't blocked instead.
+        blocked = [
+            x * self.height + y
+            for (x, y), entities in self.entities_by_location.items()
+            if any(entity.blocks_movement for entity in entities)
+        ]
+        free = locations[~np.isin(locations[:, 0] * self.height + locations[:, 1], blocked)]
+        if not len(free):
+            return None
+        x, y = free[rng.randrange(len(free))].tolist()
+        return x, y
+
+    def invalidate_tile_layer(self) -> None:
+        """Call after changing visible or explored so the next render recomposes them."""
+        self.tile_layer = None
+
+    def update_blocked(self, x: int, y: int) -> None:
+        """Recompute the blocked flag of a single tile from the entities on it."""
+        if not self.in_bounds(x, y):
+            return
+        self.blocked[x, y] = any(
+            entity.blocks_movement for entity in self.entities_by_location.get((x, y), ())
+        )
+
+    def get_entities_at_location(self, x: int, y: int) -> List[Entity]:
+        """Return the entities on the given tile, in the order they arrived."""
+        return self.entities_by_location.get((x, y), [])
+
     def get_blocking_entity_at_location(
             self, location_x: int, location_y: int,
     ) -> Optional[Entity]:
-        for entity in self.entities:
-            if (
-                    entity.blocks_movement
-                    and entity.x == location_x
-                    and entity.y == location_y
-            ):
+        for entity in self.get_entities_at_location(location_x, location_y):
+            if entity.blocks_movement:
                 return entity
 
         return None
 
     def get_actor_at_location(self, x: int, y: int) -> Optional[Actor]:
-        for actor in self.actors:
-            if actor.x == x and actor.y == y:
-                return actor
+        for entity in self.get_entities_at_location(x, y):
+            if isinstance(entity, Actor) and entity.is_alive:
+                return entity
 
         return None
 
+    def get_items_at_location(self, x: int, y: int) -> Iterator[Item]:
+        yield from (
+            entity for entity in self.get_entities_at_location(x, y) if isinstance(entity, Item)
+        )
+
     def in_bounds(self, x: int, y: int) -> bool:
         """Return True if x and y are inside of the bounds of this map."""
         return 0 <= x < self.width and 0 <= y < self.height
 
-    def render(self, console: Console) -> None:
+    def get_camera(
+        self, center_x: int, center_y: int, viewport_width: int, viewport_height: int
+    ) -> Tuple[int, int]:
+        """Return the map position drawn at the top left of a viewport centered on a position.
+
+        The camera stops at the edges of the map, maps smaller than the viewport don't scroll.
         """
-                Renders the map.
+        x = max(0, min(center_x - viewport_width // 2, self.width - viewport_width))
+        y = max(0, min(center_y - viewport_height // 2, self.height - viewport_height))
+        return x, y
+
+    def render(
+        self,
+        console: Console,
+        camera: Tuple[int, int] = (0, 0),
+        viewport_width: Optional[int] = None,
+        viewport_height: Optional[int] = None,
+    ) -> None:
+        """
+                Renders the part of the map in the viewport, with `camera` at the top left of the console.
 
                 If a tile is in the "visible" array, then draw it with the "light" colors.
                 If it isn't, but it's in the "explored" array, then draw it with the "dark" colors.
                 Otherwise, the default is "SHROUD".
                 """
-        console.tiles_rgb[0:self.width, 0:self.height] = np.select(
-            condlist=[self.visible, self.explored],
-            choicelist=[self.tiles["light"], self.tiles["dark"]],
-            default=tile_types.SHROUD,
-        )
-
-        entities_sorted_for_rendering = sorted(
-            self.entities, key=lambda x: x.render_order.value
+        camera_x, camera_y = camera
+        window = (
+            slice(camera_x, min(self.width, camera_x + (viewport_width or self.width))),
+            slice(camera_y, min(self.height, camera_y + (viewport_height or self.height))),
         )
+        if self.tile_layer is None or window != self.tile_layer_window:
+            tiles = self.tiles[window]
+            self.tile_layer_visible = self.visible[window]
+            self.tile_layer = np.select(
+                condlist=[self.tile_layer_visible, self.explored[window]],
+                choicelist=[tiles["light"], tiles["dark"]],
+                default=tile_types.SHROUD,
+            )
+            self.tile_layer_window = window
+        width, height = self.tile_layer.shape
+        console.tiles_rgb[0:width, 0:height] = self.tile_layer
 
-        for entity in entities_sorted_for_rendering:
-            # Only print entities that are in the FOV
-            if self.visible[entity.x, entity.y]: #TODO for debugging
-                console.print(
-                    x=entity.x, y=entity.y, string=entity.char, fg=entity.color
-                )
+        graphics = self.entity_graphics[:len(self.entity_graphic_rows)]
+        x = graphics["x"] - camera_x
+        y = graphics["y"] - camera_y
+        on_screen = (0 <= x) & (x < width) & (0 <= y) & (y < height)
+        graphics, x, y = graphics[on_screen], x[on_screen], y[on_screen]
+        # Only draw entities that are in the FOV
+        in_fov = self.tile_layer_visible[x, y] #TODO for debugging
+        graphics, x, y = graphics[in_fov], x[in_fov], y[in_fov]
+        # Sort so higher render orders come last, then keep only the last entity on each tile.
+        order = np.argsort(graphics["render_order"], kind="stable")[::-1]
+        _, topmost = np.unique(x[order] * height + y[order], return_index=True)
+        graphics = graphics[order[topmost]]
+        x = graphics["x"] - camera_x
+        y = graphics["y"] - camera_y
+        console.tiles_rgb["ch"][x, y] = graphics["ch"]
+        console.tiles_rgb["fg"][x, y] = graphics["fg"]
 
 class GameWorld:
     """
@@ -112,7 +361,9 @@ class GameWorld:
         max_rooms: int,
         room_min_size: int,
         room_max_size: int,
-        current_floor: int = 0
+        current_floor: int = 0,
+        corpus_filename: Optional[str] = None,
+        spawn_tables_filename: Optional[str] = None,
     ):
         self.engine = engine
 
@@ -126,16 +377,142 @@ class GameWorld:
 
         self.current_floor = current_floor
 
-    def generate_floor(self) -> None:
+        # The floor below, generated in the background while this one is played.
+        self.next_floor: Optional[FloorGenerator] = None
+
+        # What spawns on each floor, the default tables of procgen.py unless loaded from a
+        # file, see spawn_table.py.
+        self.spawn_tables_filename = spawn_tables_filename
+        self.spawn_tables: Optional[SpawnTables] = None
+        self.open_spawn_tables()
+
+        # Pre-generated floors to use instead of generating them, see corpus.py.
+        self.corpus_filename = corpus_filename
+        self.corpus: Optional[Corpus] = None
+        self.open_corpus()
+
+    def __getstate__(self) -> dict:
+        """Leave the background generation, spawn tables and corpus out of save files, they are reloaded on load."""
+        state = self.__dict__.copy()
+        state["next_floor"] = None
+        state["spawn_tables"] = None
+        state["corpus"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.open_spawn_tables()
+        self.open_corpus()
+
+    def open_spawn_tables(self) -> None:
+        """Load the spawn tables file, falling back to the default tables if there is none or it is broken."""
+        import spawn_table
+        from procgen import default_spawn_tables
+
+        self.spawn_tables = default_spawn_tables
+        if self.spawn_tables_filename is None:
+            return
+        try:
+            self.spawn_tables = spawn_table.load(self.spawn_tables_filename)
+        except (OSError, ValueError, KeyError, TypeError):
+            traceback.print_exc(file=sys.stderr)
+
+    def open_corpus(self) -> None:
+        """Open the corpus file, floors are generated as usual if it is missing or doesn't fit this world."""
+        self.corpus = None
+        if self.corpus_filename is None:
+            return
+        if self.spawn_tables_filename is not None:
+            # The entities of corpus floors were spawned from the default tables.
+            print(f"Spawning from {self.spawn_tables_filename}, ignoring {self.corpus_filename}.", file=sys.stderr)
+            return
+        from corpus import Corpus, MapSettings
+
+        try:
+            corpus = Corpus(self.corpus_filename)
+        except (OSError, ValueError, KeyError):
+            traceback.print_exc(file=sys.stderr)
+            return
+        settings = MapSettings(
+            map_width=self.map_width,
+            map_height=self.map_height,
+            max_rooms=self.max_rooms,
+            room_min_size=self.room_min_size,
+            room_max_size=self.room_max_size,
+        )
+        if corpus.settings == settings:
+            self.corpus = corpus
+        else:
+            print(f"{self.corpus_filename} was generated with other map settings, ignoring it.", file=sys.stderr)
+
+    def build_floor(self, floor: int) -> GameMap:
+        """Generate the map of `floor` without entering it.
+
+        Floors in the corpus only need their entities spawned, the tiles are read from the
+        memory-mapped file.
+        """
         from procgen import generate_dungeon
 
-        self.current_floor += 1
+        if self.corpus is not None:
+            index = self.corpus.find(self.engine.rng.seed, floor)
+            if index is not None:
+                return self.corpus.build_floor(index, self.engine)
 
-        self.engine.game_map = generate_dungeon(
+        return generate_dungeon(
             max_rooms=self.max_rooms,
             room_min_size=self.room_min_size,
             room_max_size=self.room_max_size,
             map_width=self.map_width,
             map_height=self.map_height,
             engine=self.engine,
-        )
\ No newline at end of file
+            floor_number=floor,
+            rng=self.engine.rng.for_floor(rng.MAP, floor),
+            spawn_rng=self.engine.rng.for_floor(rng.SPAWN, floor),
+            spawn_tables=self.spawn_tables,
+        )
+
+    def pregenerate_next_floor(self) -> None:
+        """Start generating the floor below the current one in the background."""
+        if self.next_floor is None or self.next_floor.floor != self.current_floor + 1:
+            self.next_floor = FloorGenerator(self, self.current_floor + 1)
+
+    def generate_floor(self) -> None:
+        self.current_floor += 1
+
+        # The floor generated in the background has a head start, so wait for it if it's still
+        # running.  It is only generated here if there wasn't one or it failed.
+        game_map = None
+        next_floor, self.next_floor = self.next_floor, None
+        if next_floor is not None and next_floor.floor == self.current_floor:
+            game_map = next_floor.result()
+        if game_map is None:
+            game_map = self.build_floor(self.current_floor)
+
+        self.engine.game_map = game_map
+        self.engine.player.place(*game_map.player_start_location, game_map)
+        playaudio("audio/jsfxr-newfloor.wav")
+
+        self.pregenerate_next_floor()
+
+
+class FloorGenerator:
+    """Generates one floor of a GameWorld on a worker thread."""
+
+    def __init__(self, game_world: GameWorld, floor: int):
+        self.floor = floor
+        self.game_map: Optional[GameMap] = None
+        self.thread = threading.Thread(
+            target=self.run, args=(game_world,), name=f"floor {floor}", daemon=True
+        )
+        self.thread.start()
+
+    def run(self, game_world: GameWorld) -> None:
+        try:
+            self.game_map = game_world.build_floor(self.floor)
+        except Exception:  # The floor will be generated again when it is entered.
+            traceback.print_exc(file=sys.stderr)
+
+    def result(self) -> Optional[GameMap]:
+        """Wait for the floor to finish, returns None if generating it failed."""
+        self.thread.join()
+        return self.game_map
\ No newline at end of file
@@ -1,7 +1,5 @@
 from __future__ import annotations
 
-import os
-
 from typing import Callable, Optional, Tuple, TYPE_CHECKING, Union
 
 import tcod.event
@@ -14,9 +12,11 @@ from actions import (
     UnjamAction,
     WaitAction
 )
+import autosave
 import color
 import exceptions
-from playaudio import playaudio
+from playaudio import new_turn, playaudio
+import save_format
 
 if TYPE_CHECKING:
     from engine import Engine
@@ -151,6 +151,7 @@ class EventHandler(BaseEventHandler):
         if action is None:
             return False
 
+        new_turn()  # Sounds of the last turn may play again.
         try:
             action.perform()
         except exceptions.Impossible as exc:
@@ -160,11 +161,16 @@ class EventHandler(BaseEventHandler):
         self.engine.handle_enemy_turns()
 
         self.engine.update_fov()
+
+        autosaver = autosave.get_autosaver()
+        if autosaver:
+            autosaver.on_turn(self.engine, new_floor=isinstance(action, actions.TakeStairsAction))
         return True
 
     def ev_mousemotion(self, event: tcod.event.MouseMotion) -> None:
-        if self.engine.game_map.in_bounds(event.tile.x, event.tile.y):
-            self.engine.mouse_location = event.tile.x, event.tile.y
+        location = self.engine.screen_to_map(event.tile.x, event.tile.y)
+        if location:
+            self.engine.mouse_location = location
 
     def on_render(self, console: tcod.Console) -> None:
         self.engine.render(console)
@@ -431,9 +437,10 @@ class SelectIndexHandler(AskUserEventHandler):
     def on_render(self, console: tcod.Console) -> None:
         """Highlight the tile under the cursor."""
         super().on_render(console)
-        x, y = self.engine.mouse_location
-        console.tiles_rgb["bg"][x, y] = color.white
-        console.tiles_rgb["fg"][x, y] = color.black
+        x, y = self.engine.map_to_screen(*self.engine.mouse_location)
+        if 0 <= x < console.width and 0 <= y < console.height:
+            console.tiles_rgb["bg"][x, y] = color.white
+            console.tiles_rgb["fg"][x, y] = color.black
 
     def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[ActionOrHandler]:
         """Check for key movement or confirmation keys."""
@@ -465,9 +472,10 @@ class SelectIndexHandler(AskUserEventHandler):
     ) -> Optional[ActionOrHandler]:
 
         """Left click confirms a selection."""
-        if self.engine.game_map.in_bounds(*event.tile):
+        location = self.engine.screen_to_map(*event.tile)
+        if location:
             if event.button == 1:
-                return self.on_index_selected(*event.tile)
+                return self.on_index_selected(*location)
         return super().ev_mousebuttondown(event)
 
     def on_index_selected(self, x: int, y: int) -> Optional[ActionOrHandler]:
@@ -545,7 +553,7 @@ class AreaRangedAttackHandler(SelectIndexHandler):
         """Highlight the tile under the cursor."""
         super().on_render(console)
 
-        x, y = self.engine.mouse_location
+        x, y = self.engine.map_to_screen(*self.engine.mouse_location)
 
         # Draw a rectangle around the targeted area, so the player can see the affected tiles.
         console.draw_frame(
@@ -610,8 +618,9 @@ class MainGameEventHandler(EventHandler):
 class GameOverEventHandler(EventHandler):
     def on_quit(self) -> None:
         """Handle exiting out of a finished game."""
-        if os.path.exists("savegame.sav"):
-            os.remove("savegame.sav")  # Deletes the active save file.
+        autosave.stop(discard=True)  # Don't let a pending autosave bring the save back.
+        self.engine.message_log.close_archive()  # Nor a pending write the message archive.
+        save_format.remove("savegame.sav")  # Deletes the active save file, its backup and message archive.
         raise exceptions.QuitWithoutSaving()  # Avoid saving a finished game.
 
     def ev_quit(self, event: tcod.event.Quit) -> None:
@@ -634,7 +643,8 @@ class HistoryViewer(EventHandler):
 
     def __init__(self, engine: Engine):
         super().__init__(engine)
-        self.log_length = len(engine.message_log.messages)
+        self.history = engine.message_log.history()
+        self.log_length = len(self.history)
         self.cursor = self.log_length - 1
 
     def on_render(self, console: tcod.Console) -> None:
@@ -655,7 +665,7 @@ class HistoryViewer(EventHandler):
             1,
             log_console.width - 2,
             log_console.height - 2,
-            self.engine.message_log.messages[: self.cursor + 1],
+            self.history.view(self.cursor + 1),
         )
         log_console.blit(console, 3, 3)
 
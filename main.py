@@ -4,18 +4,21 @@ import sys
 
 import tcod
 
+import autosave
 import color
 import exceptions
 import setup_game
 import input_handlers
+import playaudio
 
 sys.dont_write_bytecode = True
 
 def save_game(handler: input_handlers.BaseEventHandler, filename: str) -> None:
     """If the current event handler has an active Engine then save it."""
     if isinstance(handler, input_handlers.EventHandler):
-        handler.engine.save_as(filename)
-        print("Game saved.")
+        autosave.stop(discard=True)  # This save supersedes any pending autosave.
+        seconds = handler.engine.save_as(filename)
+        print(f"Game saved in {seconds * 1000:.1f} ms.")
 
 def main() -> None:
     screen_width = 80
@@ -27,6 +30,9 @@ def main() -> None:
 
     handler: input_handlers.BaseEventHandler = setup_game.MainMenu()
 
+    playaudio.get_backend()  # Decode every sound up front, rather than on the first one played.
+    autosave.set_autosaver(autosave.Autosaver("savegame.sav"))
+
     with tcod.context.new_terminal(
         screen_width,
         screen_height,
@@ -35,17 +41,29 @@ def main() -> None:
         vsync=True,
     ) as context:
         root_console = tcod.Console(screen_width, screen_height, order="F")
+        needs_render = True
+        mouse_tile = (-1, -1)
         try:
             while True:
-                root_console.clear()
-                handler.on_render(console=root_console)
-                context.present(root_console)
+                if needs_render:
+                    root_console.clear()
+                    handler.on_render(console=root_console)
+                    context.present(root_console)
+                    needs_render = False
 
                 try:
                     for event in tcod.event.wait():
                         context.convert_event(event)
+                        if isinstance(event, tcod.event.MouseMotion):
+                            # Moving the mouse within the same tile changes nothing on screen.
+                            if (event.tile.x, event.tile.y) != mouse_tile:
+                                mouse_tile = event.tile.x, event.tile.y
+                                needs_render = True
+                        else:
+                            needs_render = True
                         handler = handler.handle_events(event)
                 except Exception:  # Handle exceptions in game.
+                    needs_render = True
                     traceback.print_exc()  # Print error to stderr.
                     # Then print the error to the message log.
                     if isinstance(handler, input_handlers.EventHandler):
@@ -60,6 +78,9 @@ def main() -> None:
         except BaseException:  # Save on any other unexpected exception.
             save_game(handler, "savegame.sav")
             raise
+        finally:
+            autosave.stop()  # Finish writing any pending autosave.
+            playaudio.stop()
 
 
 if __name__ == "__main__":
@@ -1,16 +1,85 @@
-from typing import Iterable, List, Reversible, Tuple
+from __future__ import annotations
+
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+import json
+import string
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Reversible, Tuple, Union
 import textwrap
 
 import tcod
 
 import color
+from compact import Compact
+
+
+# Messages kept in memory, older ones are moved to the archive file if there is one.
+DEFAULT_CAPACITY = 1000
+# Archived messages are read back in blocks of this many, MessageHistory keeps the most
+# recently read HISTORY_BLOCKS blocks.
+HISTORY_BLOCK_SIZE = 64
+HISTORY_BLOCKS = 8
+
+# Every message text seen so far, messages refer to them by their index here.
+TEMPLATES: List[str] = []
+_template_ids: Dict[str, int] = {}
+
+
+class _TemplateFormatter(string.Formatter):
+    """str.format with one more conversion, "{!c}" capitalizes its argument."""
+
+    def convert_field(self, value: Any, conversion: Optional[str]) -> Any:
+        if conversion == "c":
+            return str(value).capitalize()
+        return super().convert_field(value, conversion)
+
 
+_formatter = _TemplateFormatter()
 
-class Message:
-    def __init__(self, text: str, fg: Tuple[int, int, int]):
-        self.plain_text = text
+
+def intern_template(template: str) -> int:
+    """Return the id of a message template, adding it if it is new."""
+    template_id = _template_ids.get(template)
+    if template_id is None:
+        template_id = _template_ids[template] = len(TEMPLATES)
+        TEMPLATES.append(template)
+    return template_id
+
+
+class Message(Compact):
+    """A message made of a template and the arguments filled into it when it is displayed.
+
+    With `args`, `text` is formatted like str.format, where "{!c}" also capitalizes its
+    argument, otherwise it is used as is.
+    """
+
+    __slots__ = ("template_id", "args", "fg", "count", "wrapped")
+
+    def __init__(self, text: str, fg: Tuple[int, int, int], args: Tuple[Any, ...] = ()):
+        self.template_id = intern_template(text)
+        self.args = args
         self.fg = fg
         self.count = 1
+        self.wrapped: Optional[Dict[int, List[str]]] = None  # Lines of full_text by wrap width.
+
+    def __getstate__(self) -> Tuple[str, Tuple[Any, ...], Tuple[int, int, int], int]:
+        """Save the template itself, ids depend on the order templates were first used.
+
+        Pickle writes each template once per save file since every message shares it.
+        """
+        return TEMPLATES[self.template_id], self.args, self.fg, self.count
+
+    def __setstate__(self, state: Tuple[str, Tuple[Any, ...], Tuple[int, int, int], int]) -> None:
+        template, self.args, self.fg, self.count = state
+        self.template_id = intern_template(template)
+        self.wrapped = None
+
+    @property
+    def plain_text(self) -> str:
+        template = TEMPLATES[self.template_id]
+        return _formatter.vformat(template, self.args, {}) if self.args else template
 
     @property
     def full_text(self) -> str:
@@ -19,23 +88,241 @@ class Message:
             return f"{self.plain_text} (x{self.count})"
         return self.plain_text
 
+    def stack(self) -> None:
+        """Count this message once more."""
+        self.count += 1
+        self.wrapped = None
+
+    def wrap(self, width: int) -> List[str]:
+        """Return full_text wrapped to `width`, the result is cached and must not be modified."""
+        if self.wrapped is None:
+            self.wrapped = {}
+        lines = self.wrapped.get(width)
+        if lines is None:
+            lines = self.wrapped[width] = list(MessageLog.wrap(self.full_text, width))
+        return lines
+
+
+class MessageView:
+    """The messages of a MessageLog or MessageHistory before `stop`, without copying them."""
+
+    def __init__(self, log: Union[MessageLog, MessageHistory], stop: int):
+        self.log = log
+        self.stop = stop
+
+    def __len__(self) -> int:
+        return self.stop
+
+    def __iter__(self) -> Iterator[Message]:
+        return (self.log[i] for i in range(self.stop))
+
+    def __reversed__(self) -> Iterator[Message]:
+        return (self.log[i] for i in range(self.stop - 1, -1, -1))
+
+
+class MessageHistory:
+    """Every message of a MessageLog, those in its archive then those in memory.
+
+    Archived messages are only read when asked for, a block at a time, so showing the
+    history costs the same however long the archive is.
+    """
+
+    def __init__(self, log: MessageLog):
+        self.log = log
+        self.archived = log.archived
+        self.blocks: OrderedDict[int, List[Message]] = OrderedDict()  # The most recently used last.
+
+    def __len__(self) -> int:
+        return self.archived + len(self.log)
+
+    def __getitem__(self, index: int) -> Message:
+        if index >= self.archived:
+            return self.log[index - self.archived]
+        block_index, offset = divmod(index, HISTORY_BLOCK_SIZE)
+        block = self.blocks.get(block_index)
+        if block is None:
+            block = self.blocks[block_index] = self.read_block(block_index)
+            if len(self.blocks) > HISTORY_BLOCKS:
+                self.blocks.popitem(last=False)
+        else:
+            self.blocks.move_to_end(block_index)
+        return block[offset]
+
+    def read_block(self, block_index: int) -> List[Message]:
+        """Read one block of messages from the archive, using the line offsets kept by the log."""
+        first = block_index * HISTORY_BLOCK_SIZE
+        last = min(first + HISTORY_BLOCK_SIZE, self.archived)
+        offsets = self.log.archive_offsets
+        with open(self.log.archive_filename, "rb") as f:  # type: ignore
+            f.seek(offsets[first])
+            data = f.read(offsets[last] - offsets[first])
+        messages = []
+        for line in data.splitlines():
+            fields = json.loads(line)
+            message = Message(fields["template"], tuple(fields["fg"]), tuple(fields["args"]))  # type: ignore
+            message.count = fields["count"]
+            messages.append(message)
+        return messages
+
+    def view(self, stop: int) -> MessageView:
+        return MessageView(self, max(0, min(stop, len(self))))
+
 
 class MessageLog:
-    def __init__(self) -> None:
-        self.messages: List[Message] = []
+    """The most recent messages, held in a ring buffer of `capacity` messages.
+
+    Once the buffer is full the oldest quarter of it is appended to `archive_filename` as
+    JSON lines, or dropped if it is None.  The file is written on a worker thread, and read
+    back as needed by the MessageHistory returned by history().  A new log starts a new
+    archive.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, archive_filename: Optional[str] = None) -> None:
+        self.capacity = max(1, capacity)
+        self.archive_filename = archive_filename
+        self.buffer: List[Optional[Message]] = [None] * self.capacity
+        self.start = 0  # Index in `buffer` of the oldest message.
+        self.length = 0
+        self.archived = 0  # Messages written to the archive so far.
+        # Where each archived message starts in the archive, and where the next one will.
+        self.archive_offsets = array("q", [0])
+        self.archive_writer: Optional[ThreadPoolExecutor] = None
+        self.archive_written: Optional[Future] = None  # The last write to the archive.
+        self.open_archive()
+
+    def __getstate__(self) -> dict:
+        """Save the messages in order rather than the buffer and its empty slots."""
+        state = self.__dict__.copy()
+        del state["buffer"], state["start"], state["length"]
+        del state["archive_offsets"], state["archive_writer"], state["archive_written"]
+        state["messages"] = list(self)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        messages = state.pop("messages")
+        self.__dict__.update(state)
+        self.buffer = [None] * self.capacity
+        self.start = 0
+        self.length = 0
+        self.archive_offsets = array("q", [0])
+        self.archive_writer = None
+        self.archive_written = None
+        self.open_archive()
+        for message in messages:
+            self.append(message)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> Message:
+        """Return a message in memory, 0 is the oldest."""
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("Message index out of range.")
+        return self.buffer[(self.start + index) % self.capacity]  # type: ignore
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self.view(self.length))
+
+    def __reversed__(self) -> Iterator[Message]:
+        return reversed(self.view(self.length))
+
+    def view(self, stop: int) -> MessageView:
+        """Return the messages before `stop` for render_messages, without copying them."""
+        return MessageView(self, max(0, min(stop, self.length)))
+
+    @property
+    def messages(self) -> MessageView:
+        return self.view(self.length)
+
+    def append(self, message: Message) -> None:
+        if self.length == self.capacity:
+            self.spill(max(1, self.capacity // 4))
+        self.buffer[(self.start + self.length) % self.capacity] = message
+        self.length += 1
+
+    def open_archive(self) -> None:
+        """Start a worker appending to the archive after the messages archived so far.
+
+        A new log starts an empty archive.  The archive of a loaded game can hold messages
+        archived after the game was saved, those are cut off, and the offsets of the others
+        are found again.
+        """
+        if self.archive_filename is None:
+            return
+        offsets = array("q", [0])
+        with open(self.archive_filename, "ab+") as f:
+            f.seek(0)
+            for line in islice(f, self.archived):
+                if not line.endswith(b"\n"):
+                    break  # Cut short while it was written.
+                offsets.append(offsets[-1] + len(line))
+            f.truncate(offsets[-1])
+        self.archived = len(offsets) - 1  # Fewer if the archive lost some.
+        self.archive_offsets = offsets
+        self.archive_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="message archive")
+
+    def close_archive(self) -> None:
+        """Wait for the archive to be written and stop its worker."""
+        if self.archive_writer is not None:
+            self.archive_writer.shutdown()
+            self.archive_writer = None
+            self.archive_written = None
+
+    def spill(self, count: int) -> None:
+        """Move the `count` oldest messages out of memory, into the archive if there is one."""
+        spilled = [self[i] for i in range(count)]
+        for i in range(count):
+            self.buffer[(self.start + i) % self.capacity] = None
+        self.start = (self.start + count) % self.capacity
+        self.length -= count
+        if self.archive_writer is not None:
+            self.archived += count
+            lines = [
+                (json.dumps({
+                    "template": TEMPLATES[message.template_id],
+                    "args": message.args,
+                    "fg": message.fg,
+                    "count": message.count,
+                }) + "\n").encode("utf-8")
+                for message in spilled
+            ]
+            for line in lines:
+                self.archive_offsets.append(self.archive_offsets[-1] + len(line))
+            self.archive_written = self.archive_writer.submit(self.write_archive, lines)
+
+    def write_archive(self, lines: List[bytes]) -> None:
+        """Append lines to the archive, this runs on the archive worker."""
+        with open(self.archive_filename, "ab") as f:  # type: ignore
+            f.writelines(lines)
+
+    def history(self) -> MessageHistory:
+        """Return every message of this log, archived messages are read from the archive when needed."""
+        if self.archive_written is not None:
+            self.archive_written.result()  # Only the last few lines can still be unwritten.
+        return MessageHistory(self)
 
     def add_message(
-        self, text: str, fg: Tuple[int, int, int] = color.white, *, stack: bool = True,
+        self,
+        text: str,
+        fg: Tuple[int, int, int] = color.white,
+        *,
+        stack: bool = True,
+        args: Tuple[Any, ...] = (),
     ) -> None:
         """Add a message to this log.
         `text` is the message text, `fg` is the text color.
+        With `args`, `text` is a template formatted with them once the message is displayed.
         If `stack` is True then the message can stack with a previous message
         of the same text.
         """
-        if stack and self.messages and text == self.messages[-1].plain_text:
-            self.messages[-1].count += 1
-        else:
-            self.messages.append(Message(text, fg))
+        if stack and self.length:
+            last = self[-1]
+            if last.template_id == intern_template(text) and last.args == args:
+                last.stack()
+                return
+        self.append(Message(text, fg, args))
 
     def render(
         self, console: tcod.Console, x: int, y: int, width: int, height: int,
@@ -71,8 +358,8 @@ class MessageLog:
         y_offset = height - 1
 
         for message in reversed(messages):
-            for line in reversed(list(cls.wrap(message.full_text, width))):
+            for line in reversed(message.wrap(width)):
                 console.print(x=x, y=y + y_offset, string=line, fg=message.fg)
                 y_offset -= 1
                 if y_offset < 0:
-                    return  # No more space to print messages.
\ No newline at end of file
+                    return  # No more space to print messages.
@@ -1,7 +1,205 @@
-from winsound import PlaySound, SND_ASYNC, SND_FILENAME
-from playsound import playsound
+"""Sound effects.
+
+Every file in `audio/` is decoded into memory once, and sounds are mixed together into a
+single SDL audio stream instead of opening and decoding the file for every event.  SDL
+comes with tcod, so the mixer needs nothing else installed.  The same sound triggered
+several times in one turn (a grenade hitting five actors) only plays once, call new_turn
+at the start of every turn.
+
+Headless runs should call `set_backend(NullBackend())`.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import wave
+from typing import Dict, List, Optional, Set
+
+import numpy as np  # type: ignore
+import tcod.sdl.audio
+
+AUDIO_DIRECTORY = "audio"
+SAMPLE_RATE = 44100
+CHANNELS = 2
+MAX_VOICES = 8  # The oldest voice is dropped when a new sound would exceed this.
+
+
+def load_wav(filename: str) -> np.ndarray:
+    """Decode a WAV file into a float32 array of shape (frames, CHANNELS) at SAMPLE_RATE."""
+    with wave.open(filename, "rb") as f:
+        channels = f.getnchannels()
+        sample_width = f.getsampwidth()
+        frame_rate = f.getframerate()
+        raw = f.readframes(f.getnframes())
+
+    if sample_width == 1:  # 8-bit WAV data is unsigned.
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    else:
+        raise ValueError(f"Unsupported sample width {sample_width} in {filename}.")
+    samples = samples.reshape(-1, channels)
+
+    if frame_rate != SAMPLE_RATE:
+        # Linear resampling is plenty for short sound effects.
+        length = int(len(samples) * SAMPLE_RATE / frame_rate)
+        old_times = np.arange(len(samples)) / frame_rate
+        new_times = np.arange(length) / SAMPLE_RATE
+        samples = np.stack(
+            [np.interp(new_times, old_times, samples[:, i]) for i in range(channels)], axis=1
+        ).astype(np.float32)
+
+    if channels == 1:
+        samples = np.repeat(samples, CHANNELS, axis=1)
+    return np.ascontiguousarray(samples[:, :CHANNELS])
+
+
+def load_sounds(directory: str = AUDIO_DIRECTORY) -> Dict[str, np.ndarray]:
+    """Decode every WAV file in `directory`, keyed by the path used to play it."""
+    sounds = {}
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(".wav"):
+            path = f"{directory}/{name}"
+            sounds[path] = load_wav(path)
+    return sounds
+
+
+class AudioBackend:
+    def play(self, file: str) -> None:
+        raise NotImplementedError()
+
+    def new_turn(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class NullBackend(AudioBackend):
+    """Plays nothing, for headless runs and machines without audio."""
+
+    def __init__(self) -> None:
+        self.played: Dict[str, int] = {}  # How many times each sound would have played.
+
+    def play(self, file: str) -> None:
+        self.played[file] = self.played.get(file, 0) + 1
+
+
+class Voice:
+    """A sound which is currently playing, and how far into it the mixer is."""
+
+    def __init__(self, file: str, samples: np.ndarray):
+        self.file = file
+        self.samples = samples
+        self.position = 0
+
+
+class Mixer(AudioBackend):
+    """Mixes a bounded pool of in-memory voices into one output stream."""
+
+    def __init__(self, sounds: Dict[str, np.ndarray], max_voices: int = MAX_VOICES):
+        self.sounds = sounds
+        self.max_voices = max_voices
+        self.voices: List[Voice] = []
+        self.played_this_turn: Set[str] = set()
+        self.lock = threading.Lock()
+        self.device: Optional[tcod.sdl.audio.AudioDevice] = None
+        self.stream: Optional[tcod.sdl.audio.AudioStream] = None
+
+    def start(self, device: tcod.sdl.audio.AudioDevice) -> None:
+        """Start mixing into a stream on `device`, SDL asks for more on its audio thread."""
+        self.device = device
+        self.stream = device.new_stream(format=np.float32, channels=CHANNELS, frequency=SAMPLE_RATE)
+        self.stream.getter_callback = self.callback
+
+    def play(self, file: str) -> None:
+        samples = self.sounds.get(file)
+        if samples is None or file in self.played_this_turn:
+            return
+        self.played_this_turn.add(file)
+
+        with self.lock:
+            if len(self.voices) >= self.max_voices:
+                self.voices.pop(0)
+            self.voices.append(Voice(file, samples))
+
+    def new_turn(self) -> None:
+        self.played_this_turn.clear()
+
+    def mix(self, frames: int) -> np.ndarray:
+        """Return the next `frames` frames of all playing voices, mixed together."""
+        out = np.zeros((frames, CHANNELS), dtype=np.float32)
+        with self.lock:
+            for voice in self.voices:
+                chunk = voice.samples[voice.position:voice.position + frames]
+                out[:len(chunk)] += chunk
+                voice.position += len(chunk)
+            self.voices = [voice for voice in self.voices if voice.position < len(voice.samples)]
+        np.clip(out, -1.0, 1.0, out=out)
+        return out
+
+    def callback(self, stream: tcod.sdl.audio.AudioStream, data: tcod.sdl.audio.AudioStreamCallbackData) -> None:
+        if data.additional_samples:
+            stream.queue_audio(self.mix(data.additional_samples))
+
+    def close(self) -> None:
+        """Stop mixing, this must be called before exiting or SDL calls back into a finalized interpreter."""
+        if self.stream is not None:
+            self.stream.getter_callback = None
+            self.stream.close()
+            self.stream = None
+        if self.device is not None:
+            self.device.close()
+            self.device = None
+
+
+_backend: Optional[AudioBackend] = None
+
+
+def create_backend() -> AudioBackend:
+    """Return a Mixer playing on the default output device, or silence if there is none.
+
+    The device is opened before any sound is decoded, so nothing is decoded for nothing.
+    """
+    try:
+        device = tcod.sdl.audio.get_default_playback().open()
+    except RuntimeError as exc:  # No audio driver or output device.
+        print(f"No audio output ({exc}).", file=sys.stderr)
+        return NullBackend()
+    mixer = Mixer(load_sounds())
+    mixer.start(device)
+    return mixer
+
+
+def get_backend() -> AudioBackend:
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend: AudioBackend) -> None:
+    """Replace the active backend, closing the previous one."""
+    global _backend
+    if _backend is not None:
+        _backend.close()
+    _backend = backend
+
+
+def stop() -> None:
+    """Close the active backend, if there is one."""
+    global _backend
+    if _backend is not None:
+        _backend.close()
+        _backend = None
+
 
 def playaudio(file : str):
-    # PlaySound(file, SND_ASYNC | SND_FILENAME)
-    playsound(file, block=False)
+    get_backend().play(file)
+
 
+def new_turn() -> None:
+    """Let every sound play once more, sounds repeated within a turn play once."""
+    if _backend is not None:
+        _backend.new_turn()
@@ -1,19 +1,15 @@
 from __future__ import annotations
 
 import random
-from typing import Dict, Iterator, List, Tuple, TYPE_CHECKING
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
 
-import tcod
+import numpy as np  # type: ignore
 
+import chunked
 import entity_factories
-from components.ai import WanderingEnemy
-from components.equipment import Equipment
-from components.fighter import Fighter
-from components.inventory import Inventory
-from components.level import Level
 from game_map import GameMap
+from spawn_table import SpawnTables
 import tile_types
-from playaudio import playaudio
 
 if TYPE_CHECKING:
     from engine import Engine
@@ -48,45 +44,9 @@ enemy_chances: Dict[int, List[Tuple[Entity, int]]] = {
 }
 
 
-def get_max_value_for_floor(
-    max_value_by_floor: List[Tuple[int, int]], floor: int
-) -> int:
-    current_value = 0
+# The spawn tables above, compiled for the floors as they are generated.
+default_spawn_tables = SpawnTables(max_items_by_floor, max_monsters_by_floor, item_chances, enemy_chances)
 
-    for floor_minimum, value in max_value_by_floor:
-        if floor_minimum > floor:
-            break
-        else:
-            current_value = value
-
-    return current_value
-
-def get_entities_at_random(
-    weighted_chances_by_floor: Dict[int, List[Tuple[Entity, int]]],
-    number_of_entities: int,
-    floor: int,
-) -> List[Entity]:
-
-    entity_weighted_chances = {}
-    for key, values in weighted_chances_by_floor.items():
-        if key <= floor:
-            entity_weighted_chances = {}
-            for value in values:
-                entity = value[0]
-                weighted_chance = value[1]
-
-                entity_weighted_chances[entity] = weighted_chance
-        else:
-            break
-
-    entities = list(entity_weighted_chances.keys())
-    entity_weighted_chance_values = list(entity_weighted_chances.values())
-
-    chosen_entities = random.choices(
-        entities, weights=entity_weighted_chance_values, k=number_of_entities
-    )
-
-    return chosen_entities
 
 class RectangularRoom:
     def __init__(self, x: int, y: int, width: int, height: int):
@@ -107,6 +67,11 @@ class RectangularRoom:
         """Return the inner area of this room as a 2D array index."""
         return slice(self.x1 + 1, self.x2), slice(self.y1 + 1, self.y2)
 
+    @property
+    def outline(self) -> Tuple[slice, slice]:
+        """Return this room including its walls as a 2D array index."""
+        return slice(self.x1, self.x2 + 1), slice(self.y1, self.y2 + 1)
+
     def intersects(self, other: RectangularRoom) -> bool:
         """Return True if this room overlaps with another RectangularRoom."""
         return (
@@ -116,58 +81,78 @@ class RectangularRoom:
             and self.y2 >= other.y1
         )
 
-def place_entities(room: RectangularRoom, dungeon: GameMap, floor_number: int,) -> None:
-    number_of_monsters = random.randint(
-        0, get_max_value_for_floor(max_monsters_by_floor, floor_number)
-    )
-    number_of_items = random.randint(
-        0, get_max_value_for_floor(max_items_by_floor, floor_number)
-    )
-
-    monsters: List[Entity] = get_entities_at_random(
-        enemy_chances, number_of_monsters, floor_number
-    )
-
-    items: List[Entity] = get_entities_at_random(
-        item_chances, number_of_items, floor_number
-    )
-
-    for entity in monsters + items:
-        x = random.randint(room.x1 + 1, room.x2 - 1)
-        y = random.randint(room.y1 + 1, room.y2 - 1)
-
-        if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
-            # marvin = Actor(
-            #     char="M",
-            #     color=(random.randint(0, 255), random.randint(0, 255), random.randint(0, 255)),
-            #     name="Marvin",
-            #     ai_cls=WanderingEnemy,
-            #     equipment=Equipment(),
-            #     fighter=Fighter(hp=1, base_defense=1, base_power=1),
-            #     inventory=Inventory(capacity=0),
-            #     level=Level(xp_given=0),
-            # )
-            # marvin.place(x, y, dungeon)
-            entity.spawn(dungeon, x, y)
+def sample_free_tiles(free: np.ndarray, count: int, rng: random.Random) -> List[Tuple[int, int]]:
+    """Return `count` distinct random (x, y) indexes of True tiles in the 2D `free` mask.
+
+    Fewer are returned only if there aren't `count` free tiles.  The cost is in finding the
+    free tiles, picking them doesn't depend on how many have been picked already.
+    """
+    candidates = np.flatnonzero(free).tolist()  # Row-major, whatever the order of `free`.
+    height = free.shape[1]
+    return [divmod(i, height) for i in rng.sample(candidates, min(count, len(candidates)))]
+
+
+def place_entities(
+    room: RectangularRoom,
+    dungeon: GameMap,
+    floor_number: int,
+    rng: random.Random,
+    spawn_tables: SpawnTables = default_spawn_tables,
+    taken: Optional[np.ndarray] = None,
+) -> None:
+    """Spawn monsters and items on distinct free tiles of `room`.
+
+    `taken` is a map sized mask of the tiles entities can't be placed on, it is updated with
+    the new entities.  Without it, the tiles with entities or the player start are taken.
+    """
+    number_of_monsters = rng.randint(0, spawn_tables.max_monsters[floor_number])
+    number_of_items = rng.randint(0, spawn_tables.max_items[floor_number])
+
+    monsters: List[Entity] = spawn_tables.enemies.sample(rng, number_of_monsters, floor_number)
+
+    items: List[Entity] = spawn_tables.items.sample(rng, number_of_items, floor_number)
+
+    if not monsters and not items:
+        return
+
+    inner_x, inner_y = room.inner
+    if taken is None:
+        free = np.ones((inner_x.stop - inner_x.start, inner_y.stop - inner_y.start), dtype=bool)
+        # The player will be placed at the start location once the floor is entered.
+        for x, y in [dungeon.player_start_location, *dungeon.entities_by_location]:
+            if inner_x.start <= x < inner_x.stop and inner_y.start <= y < inner_y.stop:
+                free[x - inner_x.start, y - inner_y.start] = False
+    else:
+        free = ~taken[room.inner]
+
+    positions = sample_free_tiles(free, len(monsters) + len(items), rng)
+    for entity, (x, y) in zip(monsters + items, positions):
+        x += inner_x.start
+        y += inner_y.start
+        entity.spawn(dungeon, x, y)
+        if taken is not None:
+            taken[x, y] = True
+
+def straight_line(start: Tuple[int, int], end: Tuple[int, int]) -> Tuple[slice, slice]:
+    """Return a horizontal or vertical line between two points, ends included, as a 2D array index."""
+    (x1, y1), (x2, y2) = start, end
+    return slice(min(x1, x2), max(x1, x2) + 1), slice(min(y1, y2), max(y1, y2) + 1)
+
 
 def tunnel_between(
-    start: Tuple[int, int], end: Tuple[int, int]
-) -> Iterator[Tuple[int, int]]:
-    """Return an L-shaped tunnel between these two points."""
+    start: Tuple[int, int], end: Tuple[int, int], rng: random.Random
+) -> Tuple[Tuple[slice, slice], Tuple[slice, slice]]:
+    """Return an L-shaped tunnel between these two points, as two 2D array indexes."""
     x1, y1 = start
     x2, y2 = end
-    if random.random() < 0.5:  # 50% chance.
+    if rng.random() < 0.5:  # 50% chance.
         # Move horizontally, then vertically.
         corner_x, corner_y = x2, y1
     else:
         # Move vertically, then horizontally.
         corner_x, corner_y = x1, y2
 
-    # Generate the coordinates for this tunnel.
-    for x, y in tcod.los.bresenham((x1, y1), (corner_x, corner_y)).tolist():
-        yield x, y
-    for x, y in tcod.los.bresenham((corner_x, corner_y), (x2, y2)).tolist():
-        yield x, y
+    return straight_line((x1, y1), (corner_x, corner_y)), straight_line((corner_x, corner_y), (x2, y2))
 
 def generate_dungeon(
     max_rooms: int,
@@ -175,52 +160,71 @@ def generate_dungeon(
     room_max_size: int,
     map_width: int,
     map_height: int,
-    engine: Engine,
+    engine: Optional[Engine],
+    floor_number: int,
+    rng: random.Random,
+    spawn_rng: random.Random,
+    spawn_tables: SpawnTables = default_spawn_tables,
 ) -> GameMap:
-    """Generate a new dungeon map."""
-    player = engine.player
-    dungeon = GameMap(engine, map_width, map_height, entities=[player])
+    """Generate a new dungeon map, with `rng` for the layout and `spawn_rng` for its entities.
+
+    What spawns is decided by `spawn_tables`, which can be loaded from a file with
+    spawn_table.load.
+
+    The player isn't placed on it, see GameMap.player_start_location.  This doesn't touch
+    the floor being played, so it is safe to call from a worker thread as long as the
+    generators aren't shared.  `engine` may be None for floors generated outside of a game.
+    """
+    dungeon = GameMap(engine, map_width, map_height)
 
     rooms: List[RectangularRoom] = []
+    # The outlines of accepted rooms, a room intersects another if any tile of its own outline
+    # is taken.  This makes the test independent of how many rooms there are.
+    occupied = np.zeros((map_width + 1, map_height + 1), dtype=bool, order="F")
+    # Everything dug out, written to the map at once when done.
+    dug = np.zeros((map_width, map_height), dtype=bool, order="F")
+    # Tiles entities can't be placed on.
+    taken = np.zeros((map_width, map_height), dtype=bool, order="F")
 
     center_of_last_room = (0, 0)
 
     for r in range(max_rooms):
-        room_width = random.randint(room_min_size, room_max_size)
-        room_height = random.randint(room_min_size, room_max_size)
+        room_width = rng.randint(room_min_size, room_max_size)
+        room_height = rng.randint(room_min_size, room_max_size)
 
-        x = random.randint(0, dungeon.width - room_width - 1)
-        y = random.randint(0, dungeon.height - room_height - 1)
+        x = rng.randint(0, dungeon.width - room_width - 1)
+        y = rng.randint(0, dungeon.height - room_height - 1)
 
         # "RectangularRoom" class makes rectangles easier to work with
         new_room = RectangularRoom(x, y, room_width, room_height)
 
-        # Run through the other rooms and see if they intersect with this one.
-        if any(new_room.intersects(other_room) for other_room in rooms):
+        # Check if this room intersects with any of the others.
+        if occupied[new_room.outline].any():
             continue  # This room intersects, so go to the next attempt.
         # If there are no intersections then the room is valid.
+        occupied[new_room.outline] = True
 
         # Dig out this rooms inner area.
-        dungeon.tiles[new_room.inner] = tile_types.floor
+        dug[new_room.inner] = True
 
         if len(rooms) == 0:
             # The first room, where the player starts.
-            player.place(*new_room.center, dungeon)
+            dungeon.player_start_location = new_room.center
+            taken[new_room.center] = True
         else:  # All rooms after the first.
             # Dig out a tunnel between this room and the previous one.
-            for x, y in tunnel_between(rooms[-1].center, new_room.center):
-                dungeon.tiles[x, y] = tile_types.floor
+            for line in tunnel_between(rooms[-1].center, new_room.center, rng):
+                dug[line] = True
 
             center_of_last_room = new_room.center
 
-        place_entities(new_room, dungeon, engine.game_world.current_floor)
-
-        dungeon.tiles[center_of_last_room] = tile_types.down_stairs
-        dungeon.downstairs_location = center_of_last_room
+        place_entities(new_room, dungeon, floor_number, spawn_rng, spawn_tables, taken)
 
         # Finally, append the new room to the list.
         rooms.append(new_room)
 
-    playaudio("audio/jsfxr-newfloor.wav")
+    chunked.put(dungeon.tiles, dug, tile_types.floor)
+    dungeon.tiles[center_of_last_room] = tile_types.down_stairs
+    dungeon.downstairs_location = center_of_last_room
 
     return dungeon
@@ -0,0 +1,39 @@
+"""Seeded random number streams, so that a seed always plays out the same game.
+
+Each subsystem draws from its own stream, so for example an extra roll in the AI doesn't
+change the outcome of the next gunshot.  Floors get a fresh stream per floor number, so a
+floor is the same whenever it is generated, even in the background.
+"""
+from __future__ import annotations
+
+import random
+from typing import Dict, Optional
+
+MAP = "map"  # Room and tunnel layout.
+SPAWN = "spawn"  # Which monsters and items are placed, and where.
+AI = "ai"
+COMBAT = "combat"
+
+
+class RandomStreams:
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.streams: Dict[str, random.Random] = {}
+
+    def get(self, name: str) -> random.Random:
+        """Return the stream for a subsystem, it continues where it left off and is saved with the game."""
+        if name not in self.streams:
+            self.streams[name] = random.Random(f"{self.seed}:{name}")
+        return self.streams[name]
+
+    def for_floor(self, name: str, floor: int) -> random.Random:
+        """Return a new stream for a subsystem on one floor, the same every time it is asked for."""
+        return random.Random(f"{self.seed}:{name}:{floor}")
+
+    @property
+    def ai(self) -> random.Random:
+        return self.get(AI)
+
+    @property
+    def combat(self) -> random.Random:
+        return self.get(COMBAT)
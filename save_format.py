@@ -0,0 +1,195 @@
+"""Reading and writing save files.
+
+A save file is laid out as:
+
+    MAGIC, header offset (uint64), sections..., JSON header
+
+corpus.py writes its files the same way, with write_sectioned and read_sectioned_header.
+
+The Engine is pickled into the "engine" section with protocol 5, and every NumPy array
+it holds (the tile, visible and explored arrays) is written out-of-band as its own raw,
+uncompressed and 64-byte aligned section.  Those sections can be memory-mapped straight
+back into arrays on load, so only the small pickled object graph pays for compression.
+
+Games saved before this format, as one LZMA compressed pickle, can't be continued: load
+raises IncompatibleSave for them and the main menu says so.
+"""
+from __future__ import annotations
+
+import bz2
+import json
+import lzma
+import os
+import pickle
+import struct
+import time
+import zlib
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+MAGIC = b"HCSAVE\x00\x01"
+VERSION = 1
+ALIGNMENT = 64
+DEFAULT_COMPRESSION = "zlib"
+
+COMPRESSORS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "none": (bytes, bytes),
+    "zlib": (lambda data: zlib.compress(data, 1), zlib.decompress),
+    "bz2": (lambda data: bz2.compress(data, 1), bz2.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+# Seconds spent by the most recent snapshot, save and load, for the curious and for benchmark.py.
+timings: Dict[str, float] = {"snapshot": 0.0, "save": 0.0, "load": 0.0}
+
+
+class IncompatibleSave(ValueError):
+    """The file was saved by a version of the game whose saves can't be loaded any more."""
+
+
+def write_sectioned(f: BinaryIO, magic: bytes, sections: Iterable[Tuple[str, bytes]], header: dict) -> None:
+    """Write `magic`, the header offset, every (name, data) section and then `header` to `f`.
+
+    Sections start on an ALIGNMENT boundary so they can be memory-mapped.  Their names,
+    offsets and lengths are added to the JSON header as its "sections" list.
+    """
+    f.write(magic)
+    f.write(struct.pack("<Q", 0))  # Header offset, filled in once known.
+    entries = []
+    for name, data in sections:
+        f.write(b"\x00" * (-f.tell() % ALIGNMENT))
+        entries.append({"name": name, "offset": f.tell(), "length": len(data)})
+        f.write(data)
+
+    header_offset = f.tell()
+    f.write(json.dumps({**header, "sections": entries}).encode("utf-8"))
+    f.seek(len(magic))
+    f.write(struct.pack("<Q", header_offset))
+
+
+def read_sectioned_header(f: BinaryIO, magic: bytes) -> Optional[dict]:
+    """Return the JSON header of a file written by write_sectioned, or None if it doesn't start with `magic`."""
+    if f.read(len(magic)) != magic:
+        return None
+    (header_offset,) = struct.unpack("<Q", f.read(8))
+    f.seek(header_offset)
+    return json.loads(f.read().decode("utf-8"))
+
+
+class Snapshot:
+    """An Engine pickled at a point in time, which no longer depends on the live game."""
+
+    def __init__(self, engine_data: bytes, buffers: List[bytes]):
+        self.engine_data = engine_data  # Uncompressed pickle of the Engine.
+        self.buffers = buffers  # Copies of the out-of-band array data.
+
+
+def snapshot(engine: Engine) -> Snapshot:
+    """Capture the current state of the Engine.  This must run on the main thread."""
+    start = time.perf_counter()
+    buffers: List[pickle.PickleBuffer] = []
+    engine_data = pickle.dumps(engine, protocol=5, buffer_callback=buffers.append)
+    result = Snapshot(engine_data, [bytes(buffer.raw()) for buffer in buffers])
+    timings["snapshot"] = time.perf_counter() - start
+    return result
+
+
+def backup_filename(filename: str) -> str:
+    """The file the previous good save is kept in."""
+    return f"{filename}.bak"
+
+
+def write(
+    snapshot: Snapshot,
+    filename: str,
+    compression: str = DEFAULT_COMPRESSION,
+    keep_backup: bool = True,
+) -> None:
+    """Compress and write a snapshot to `filename`, replacing it atomically.
+
+    This doesn't touch the live game, so it is safe to call from a worker thread.
+    If `keep_backup` is True the save being replaced is kept as its backup_filename.
+    """
+    compress, _ = COMPRESSORS[compression]
+    engine_data = compress(snapshot.engine_data)
+
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, "wb") as f:
+        sections = [("engine", engine_data)] + [
+            (f"buffer{i}", buffer) for i, buffer in enumerate(snapshot.buffers)
+        ]
+        write_sectioned(f, MAGIC, sections, {"version": VERSION, "compression": compression})
+        f.flush()
+        os.fsync(f.fileno())  # Make sure the new save is on disk before replacing the old one.
+
+    if keep_backup and os.path.exists(filename):
+        os.replace(filename, backup_filename(filename))
+    os.replace(temp_filename, filename)
+
+
+def save(engine: Engine, filename: str, compression: str = DEFAULT_COMPRESSION) -> float:
+    """Save the Engine to `filename`, replacing it atomically.  Returns the seconds taken."""
+    start = time.perf_counter()
+    write(snapshot(engine), filename, compression)
+    timings["save"] = time.perf_counter() - start
+    return timings["save"]
+
+
+def read_header(filename: str) -> dict:
+    """Return the JSON header of a save file."""
+    with open(filename, "rb") as f:
+        header = read_sectioned_header(f, MAGIC)
+    if header is None:
+        # Older saves are a pickled Engine compressed with LZMA, from before the map and
+        # its entities were stored the way they are now.
+        raise IncompatibleSave(f"{filename} was saved by an older version of the game.")
+    if header["version"] != VERSION:
+        raise IncompatibleSave(f"Unsupported save version {header['version']}.")
+    return header
+
+
+def messages_filename(filename: str) -> str:
+    """The file the messages which no longer fit in the message log of a save are archived in."""
+    return f"{filename}.messages"
+
+
+def remove(filename: str) -> None:
+    """Delete a save file along with its backup and message archive."""
+    for path in (filename, backup_filename(filename), messages_filename(filename)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def load(filename: str, mmap: bool = False) -> Engine:
+    """Load an Engine from `filename`.
+
+    If `mmap` is True then the tile arrays are copy-on-write memory maps of the file,
+    otherwise they are read into memory.
+    """
+    start = time.perf_counter()
+    header = read_header(filename)
+    _, decompress = COMPRESSORS[header["compression"]]
+    sections = {section["name"]: section for section in header["sections"]}
+
+    buffers = []
+    with open(filename, "rb") as f:
+        for i in range(len(sections) - 1):
+            section = sections[f"buffer{i}"]
+            if mmap:
+                buffers.append(np.memmap(
+                    f, dtype=np.uint8, mode="c", offset=section["offset"], shape=(section["length"],)
+                ))
+            else:
+                f.seek(section["offset"])
+                buffers.append(bytearray(f.read(section["length"])))
+
+        section = sections["engine"]
+        f.seek(section["offset"])
+        engine = pickle.loads(decompress(f.read(section["length"])), buffers=buffers)
+
+    timings["load"] = time.perf_counter() - start
+    return engine
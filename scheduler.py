@@ -0,0 +1,144 @@
+"""Turn order for the actors of a GameMap.
+
+Every actor waiting to act is queued by the time of its next action.  Time is counted in
+ticks, a turn of an actor of NORMAL_SPEED takes TURN_TIME ticks, a faster actor takes
+fewer ticks and so acts more often.  Actors which aren't queued, such as the dead or the
+dormant, cost nothing per turn.
+
+Actors far from the player are dormant, they are kept in DormantActors until the player
+comes close again, see Engine.handle_enemy_turns.
+"""
+from __future__ import annotations
+
+import heapq
+from typing import Dict, Iterator, List, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from entity import Actor
+
+TURN_TIME = 100
+NORMAL_SPEED = 100
+DORMANT_CELL_SIZE = 32
+
+
+def action_time(actor: Actor) -> int:
+    """Return how many ticks an action of `actor` takes."""
+    speed = actor.speed
+    if speed == NORMAL_SPEED:
+        return TURN_TIME
+    return max(1, TURN_TIME * NORMAL_SPEED // max(1, speed))
+
+
+class TurnScheduler:
+    def __init__(self) -> None:
+        self.time = 0
+        # The actors due at each tick in the order they were queued, and a heap of those ticks.
+        # Actors mostly share a few ticks, so this is cheaper than a heap entry per actor.
+        self.buckets: Dict[int, List[Actor]] = {}
+        self.times: List[int] = []
+        # The tick each queued actor is due at.  Bucket entries of an actor which was
+        # unscheduled or rescheduled since are skipped once they come up.
+        self.entries: Dict[Actor, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, actor: Actor) -> bool:
+        return actor in self.entries
+
+    def schedule(self, actor: Actor, time: int) -> None:
+        """Queue the next action of `actor` at `time`, replacing any it already had."""
+        self.entries[actor] = time
+        bucket = self.buckets.get(time)
+        if bucket is None:
+            bucket = self.buckets[time] = []
+            heapq.heappush(self.times, time)
+        bucket.append(actor)
+
+    def add(self, actor: Actor) -> None:
+        """Queue `actor` to act one action from now, unless it is queued already."""
+        if actor not in self.entries:
+            self.schedule(actor, self.time + action_time(actor))
+
+    def remove(self, actor: Actor) -> None:
+        """Take `actor` out of the queue, until it is added again."""
+        self.entries.pop(actor, None)
+
+    def advance(self, ticks: int) -> Iterator[Actor]:
+        """Move time forward by `ticks`, yielding every actor due to act by then in order.
+
+        Each actor yielded is queued for its next action before the next one is yielded,
+        so an actor may come up more than once if it is faster than `ticks`.
+        """
+        self.time += ticks
+        times = self.times
+        entries = self.entries
+        while times and times[0] <= self.time:
+            time = heapq.heappop(times)
+            next_time = time + TURN_TIME  # Where actors of normal speed go, looked up once.
+            next_bucket = self.buckets.get(next_time)
+            for actor in self.buckets.pop(time):
+                if entries.get(actor) != time:
+                    continue  # Stale, the actor was removed or rescheduled.
+                if not actor.is_alive:
+                    del entries[actor]
+                    continue
+                if actor.speed != NORMAL_SPEED:
+                    self.schedule(actor, time + action_time(actor))
+                elif next_bucket is not None:  # Only buckets due by now are popped, so it is still queued.
+                    entries[actor] = next_time
+                    next_bucket.append(actor)
+                else:
+                    self.schedule(actor, next_time)
+                    next_bucket = self.buckets[next_time]
+                yield actor
+
+
+class DormantActors:
+    """Actors taken out of the turn order for being far from the player, by map region.
+
+    Regions are squares of `cell_size` tiles, so finding the actors near a position only
+    looks at the regions around it however many actors are dormant elsewhere.
+    """
+
+    def __init__(self, cell_size: int = DORMANT_CELL_SIZE):
+        self.cell_size = cell_size
+        # Actors by region, each with the tick it went dormant at.
+        self.cells: Dict[Tuple[int, int], Dict[Actor, int]] = {}
+        self.where: Dict[Actor, Tuple[int, int]] = {}  # The region of each dormant actor.
+
+    def __len__(self) -> int:
+        return len(self.where)
+
+    def __contains__(self, actor: Actor) -> bool:
+        return actor in self.where
+
+    def add(self, actor: Actor, time: int) -> None:
+        cell = (actor.x // self.cell_size, actor.y // self.cell_size)
+        self.where[actor] = cell
+        self.cells.setdefault(cell, {})[actor] = time
+
+    def remove(self, actor: Actor) -> None:
+        cell = self.where.pop(actor, None)
+        if cell is not None:
+            actors = self.cells[cell]
+            del actors[actor]
+            if not actors:
+                del self.cells[cell]
+
+    def pop_near(self, x: int, y: int, radius: int) -> List[Tuple[Actor, int]]:
+        """Remove and return the actors within `radius` tiles of (x, y), with the tick each went dormant at."""
+        size = self.cell_size
+        found = []
+        for cell_x in range((x - radius) // size, (x + radius) // size + 1):
+            for cell_y in range((y - radius) // size, (y + radius) // size + 1):
+                actors = self.cells.get((cell_x, cell_y))
+                if actors:
+                    found.extend(
+                        (actor, time)
+                        for actor, time in actors.items()
+                        if max(abs(actor.x - x), abs(actor.y - y)) <= radius
+                    )
+        for actor, _ in found:
+            self.remove(actor)
+        return found
@@ -1,9 +1,7 @@
 """Handle the loading and initialization of game sessions."""
 from __future__ import annotations
 
-import copy
-import lzma
-import pickle
+import os
 import traceback
 from typing import Optional
 
@@ -14,24 +12,38 @@ from engine import Engine
 import entity_factories
 from game_map import GameWorld
 import input_handlers
+from message_log import MessageLog
+import save_format
 
 
 # Load the background image and remove the alpha channel.
 background_image = tcod.image.load("menu_background.png")[:, :, :3]
 
 
-def new_game() -> Engine:
-    """Return a brand new game session as an Engine instance."""
-    map_width = 80
-    map_height = 43
-
+def new_game(
+    map_width: int = 80,
+    map_height: int = 43,
+    max_rooms: int = 30,
+    seed: Optional[int] = None,
+    corpus_filename: Optional[str] = None,
+    message_archive: Optional[str] = None,
+    spawn_tables_filename: Optional[str] = None,
+) -> Engine:
+    """Return a brand new game session as an Engine instance.
+
+    Maps larger than the screen scroll to follow the player.  The same `seed` always
+    generates the same floors, a random one is picked if it is None.  Floors are taken from
+    the corpus file `corpus_filename` when it has them, see corpus.py.  Messages which
+    no longer fit in the log are written to `message_archive`, if given.  Entities spawn
+    from the spawn tables file `spawn_tables_filename` if given, see spawn_table.py.
+    """
     room_max_size = 10
     room_min_size = 6
-    max_rooms = 30
 
-    player = copy.deepcopy(entity_factories.player)
+    player = entity_factories.player.clone()
 
-    engine = Engine(player=player)
+    engine = Engine(player=player, seed=seed)
+    engine.message_log = MessageLog(archive_filename=message_archive)
 
     engine.game_world = GameWorld(
         engine=engine,
@@ -40,6 +52,8 @@ def new_game() -> Engine:
         room_max_size=room_max_size,
         map_width=map_width,
         map_height=map_height,
+        corpus_filename=corpus_filename,
+        spawn_tables_filename=spawn_tables_filename,
     )
 
     starting_floor = 1
@@ -51,14 +65,14 @@ def new_game() -> Engine:
         "You enter the Hostile Corridors! Good luck, stay alive.", color.welcome_text
     )
 
-    brassknuckles = copy.deepcopy(entity_factories.brassknuckles)
-    knife = copy.deepcopy(entity_factories.knife)
-    pistol = copy.deepcopy(entity_factories.pistol)
-    light_armor = copy.deepcopy(entity_factories.light_armor)
+    brassknuckles = entity_factories.brassknuckles.clone()
+    knife = entity_factories.knife.clone()
+    pistol = entity_factories.pistol.clone()
+    light_armor = entity_factories.light_armor.clone()
 
-    lightsaber = copy.deepcopy(entity_factories.lightsaber)
-    bfg = copy.deepcopy(entity_factories.bfg)
-    plot_armor = copy.deepcopy(entity_factories.plot_armor)
+    lightsaber = entity_factories.lightsaber.clone()
+    bfg = entity_factories.bfg.clone()
+    plot_armor = entity_factories.plot_armor.clone()
 
     brassknuckles.parent = player.inventory
     knife.parent = player.inventory
@@ -95,10 +109,17 @@ def new_game() -> Engine:
     return engine
 
 def load_game(filename: str) -> Engine:
-    """Load an Engine instance from a file."""
-    with open(filename, "rb") as f:
-        engine = pickle.loads(lzma.decompress(f.read()))
+    """Load an Engine instance from a file, falling back to its backup if it is missing or damaged."""
+    try:
+        engine = save_format.load(filename)
+    except Exception:
+        backup = save_format.backup_filename(filename)
+        if not os.path.exists(backup):
+            raise
+        traceback.print_exc()  # Print to stderr.
+        engine = save_format.load(backup)
     assert isinstance(engine, Engine)
+    engine.game_world.pregenerate_next_floor()
     return engine
 
 
@@ -149,10 +170,14 @@ class MainMenu(input_handlers.BaseEventHandler):
                 return input_handlers.MainGameEventHandler(load_game("savegame.sav"))
             except FileNotFoundError:
                 return input_handlers.PopupMessage(self, "No saved game to load.")
+            except save_format.IncompatibleSave:
+                return input_handlers.PopupMessage(
+                    self, "The saved game is from an older version\nand can't be continued."
+                )
             except Exception as exc:
                 traceback.print_exc()  # Print to stderr.
                 return input_handlers.PopupMessage(self, f"Failed to load save:\n{exc}")
         elif event.sym == tcod.event.K_n:
-            return input_handlers.MainGameEventHandler(new_game())
+            return input_handlers.MainGameEventHandler(new_game(message_archive=save_format.messages_filename("savegame.sav")))
 
         return None
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""Weighted spawn tables, compiled once per floor.
+
+A table lists what can spawn from a floor onwards, the entries of the deepest floor
+reached replace those of the floors above.  For each floor asked for, the table is turned
+into a list of entities and their cumulative weights once, so picking an entity is a
+bisect instead of walking the whole table.
+
+Tables can also be loaded from a JSON file naming entity_factories prototypes, a game uses
+them when new_game is given the file as spawn_tables_filename (benchmark.py --spawn-tables):
+
+    {
+        "max_items_by_floor": [[1, 1], [4, 2]],
+        "max_monsters_by_floor": [[1, 2], [4, 3]],
+        "item_chances": {"1": [["stimpak", 40], ["ammo_box", 30]]},
+        "enemy_chances": {"1": [["grunt", 100]], "4": [["grunt", 80], ["brute", 20]]}
+    }
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from itertools import accumulate
+import json
+import random
+from typing import Dict, List, Sequence, Tuple, TYPE_CHECKING
+
+import entity_factories
+
+if TYPE_CHECKING:
+    from entity import Entity
+
+class FloorValues:
+    """A value which changes from some floors onwards, such as the most items per room."""
+
+    def __init__(self, value_by_floor: Sequence[Tuple[int, int]]):
+        self.value_by_floor = sorted(value_by_floor)
+        self.floor_minimums = [floor_minimum for floor_minimum, _ in self.value_by_floor]
+        self.cache: Dict[int, int] = {}
+
+    def __getitem__(self, floor: int) -> int:
+        """Return the value for `floor`, or 0 before the first floor listed."""
+        value = self.cache.get(floor)
+        if value is None:
+            i = bisect_right(self.floor_minimums, floor)
+            value = self.cache[floor] = self.value_by_floor[i - 1][1] if i else 0
+        return value
+
+
+class WeightTable:
+    """The entities which can spawn on one floor with their cumulative weights."""
+
+    def __init__(self, entities: List[Entity], weights: List[int]):
+        self.entities = entities
+        self.cum_weights = list(accumulate(weights))
+
+    def sample(self, rng: random.Random, k: int) -> List[Entity]:
+        """Pick `k` entities."""
+        if not self.entities:
+            return []
+        return rng.choices(self.entities, cum_weights=self.cum_weights, k=k)
+
+
+class SpawnTable:
+    """Entity weights by the floor they start from, compiled into a WeightTable per floor."""
+
+    def __init__(self, chances_by_floor: Dict[int, List[Tuple[Entity, int]]]):
+        self.chances_by_floor = dict(sorted(chances_by_floor.items()))
+        self.floor_minimums = list(self.chances_by_floor)
+        self.cache: Dict[int, WeightTable] = {}
+
+    def for_floor(self, floor: int) -> WeightTable:
+        table = self.cache.get(floor)
+        if table is None:
+            table = self.cache[floor] = self.compile(floor)
+        return table
+
+    def compile(self, floor: int) -> WeightTable:
+        i = bisect_right(self.floor_minimums, floor)
+        chances: Dict[Entity, int] = {}  # An entity listed twice keeps its last weight.
+        if i:
+            for entity, weight in self.chances_by_floor[self.floor_minimums[i - 1]]:
+                chances[entity] = weight
+        return WeightTable(list(chances), list(chances.values()))
+
+    def sample(self, rng: random.Random, k: int, floor: int) -> List[Entity]:
+        return self.for_floor(floor).sample(rng, k)
+
+
+class SpawnTables:
+    """Everything procgen needs to decide what spawns in a room."""
+
+    def __init__(
+        self,
+        max_items_by_floor: Sequence[Tuple[int, int]],
+        max_monsters_by_floor: Sequence[Tuple[int, int]],
+        item_chances: Dict[int, List[Tuple[Entity, int]]],
+        enemy_chances: Dict[int, List[Tuple[Entity, int]]],
+    ):
+        self.max_items = FloorValues(max_items_by_floor)
+        self.max_monsters = FloorValues(max_monsters_by_floor)
+        self.items = SpawnTable(item_chances)
+        self.enemies = SpawnTable(enemy_chances)
+
+
+def _prototype(name: str) -> Entity:
+    from entity import Entity
+
+    prototype = getattr(entity_factories, name, None)
+    if not isinstance(prototype, Entity):
+        raise ValueError(f"{name!r} is not an entity in entity_factories.")
+    return prototype
+
+
+def _chances(data: Dict[str, List[List]]) -> Dict[int, List[Tuple[Entity, int]]]:
+    return {
+        int(floor): [(_prototype(name), int(weight)) for name, weight in entries]
+        for floor, entries in data.items()
+    }
+
+
+def load(filename: str) -> SpawnTables:
+    """Load spawn tables from a JSON file, see the module docstring for its layout."""
+    with open(filename, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return SpawnTables(
+        max_items_by_floor=[(int(floor), int(value)) for floor, value in data["max_items_by_floor"]],
+        max_monsters_by_floor=[(int(floor), int(value)) for floor, value in data["max_monsters_by_floor"]],
+        item_chances=_chances(data["item_chances"]),
+        enemy_chances=_chances(data["enemy_chances"]),
+    )
@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def game_directory(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Run from the game directory, it loads its images and sounds by relative path."""
+    monkeypatch.chdir(ROOT)
@@ -0,0 +1,43 @@
+import pathlib
+import pickle
+
+from message_log import HISTORY_BLOCK_SIZE, MessageLog
+
+
+def test_history_reads_archived_messages(tmp_path: pathlib.Path) -> None:
+    """Messages moved to the archive are read back in order, before those in memory."""
+    log = MessageLog(capacity=8, archive_filename=str(tmp_path / "messages"))
+    count = HISTORY_BLOCK_SIZE * 3 + 5
+    for i in range(count):
+        log.add_message("Message {}", args=(i,))
+    log.add_message("Message {}", args=(count - 1,))  # Stacks with the last one.
+
+    history = log.history()
+    assert log.archived > HISTORY_BLOCK_SIZE * 2
+    assert len(history) == count
+    assert [message.plain_text for message in history.view(count)] == [f"Message {i}" for i in range(count)]
+    assert [message.full_text for message in reversed(history.view(3))] == ["Message 2", "Message 1", "Message 0"]
+    assert history[count - 1].full_text == f"Message {count - 1} (x2)"
+    log.close_archive()
+
+
+def test_loaded_log_finds_its_archive_again(tmp_path: pathlib.Path) -> None:
+    """A pickled log reads its archive back, without the messages archived after it was pickled."""
+    log = MessageLog(capacity=8, archive_filename=str(tmp_path / "messages"))
+    for i in range(40):
+        log.add_message("Message {}", args=(i,))
+    data = pickle.dumps(log)
+    for i in range(40, 80):
+        log.add_message("Message {}", args=(i,))
+    log.close_archive()
+
+    loaded = pickle.loads(data)
+    history = loaded.history()
+    assert len(history) == 40
+    assert [message.plain_text for message in history.view(40)] == [f"Message {i}" for i in range(40)]
+    loaded.add_message("Message {}", args=(40,))
+    for i in range(41, 60):
+        loaded.add_message("Message {}", args=(i,))
+    history = loaded.history()
+    assert [message.plain_text for message in history.view(60)] == [f"Message {i}" for i in range(60)]
+    loaded.close_archive()
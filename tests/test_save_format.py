@@ -0,0 +1,43 @@
+import os
+import pathlib
+
+import pytest
+
+import save_format
+
+SAVES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saves")
+
+
+def test_baseline_save_is_incompatible() -> None:
+    """Saves from before save_format are refused rather than loaded half working."""
+    with pytest.raises(save_format.IncompatibleSave):
+        save_format.load(os.path.join(SAVES, "baseline.sav"))
+
+
+def test_save_round_trip(tmp_path: pathlib.Path) -> None:
+    """A game saved after a few turns loads with the same actors queued, and they act."""
+    import actions
+    import input_handlers
+    import playaudio
+    import setup_game
+
+    playaudio.set_backend(playaudio.NullBackend())
+    filename = str(tmp_path / "savegame.sav")
+    engine = setup_game.new_game(seed=1)
+    handler = input_handlers.MainGameEventHandler(engine)
+    for _ in range(5):
+        handler.handle_action(actions.WaitAction(engine.player))
+    engine.save_as(filename)
+
+    reloaded = setup_game.load_game(filename)
+    assert len(reloaded.game_map.scheduler) == len(engine.game_map.scheduler)
+    assert reloaded.game_map.scheduler.time == engine.game_map.scheduler.time
+    enemies = [actor for actor in reloaded.game_map.actors if actor is not reloaded.player]
+    assert all(actor in reloaded.game_map.scheduler or actor in reloaded.game_map.dormant for actor in enemies)
+
+    handler = input_handlers.MainGameEventHandler(reloaded)
+    before = {actor: (actor.x, actor.y) for actor in enemies if actor in reloaded.game_map.scheduler}
+    for _ in range(10):
+        if reloaded.player.is_alive:
+            handler.handle_action(actions.WaitAction(reloaded.player))
+    assert any((actor.x, actor.y) != location for actor, location in before.items())
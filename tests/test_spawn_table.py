@@ -0,0 +1,37 @@
+import json
+import pathlib
+
+import spawn_table
+
+
+def test_game_spawns_from_loaded_tables(tmp_path: pathlib.Path) -> None:
+    """Spawn tables loaded from a file replace the defaults, and are reloaded with the save."""
+    import playaudio
+    import setup_game
+
+    playaudio.set_backend(playaudio.NullBackend())
+    filename = str(tmp_path / "spawns.json")
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "max_items_by_floor": [[1, 0]],
+                "max_monsters_by_floor": [[1, 4]],
+                "item_chances": {},
+                "enemy_chances": {"1": [["marvin", 1]]},
+            },
+            f,
+        )
+    tables = spawn_table.load(filename)
+    assert tables.max_monsters[3] == 4
+
+    engine = setup_game.new_game(seed=1, spawn_tables_filename=filename)
+    enemies = [actor for actor in engine.game_map.actors if actor is not engine.player]
+    assert enemies
+    assert {actor.name for actor in enemies} == {"Marvin"}
+    assert not list(engine.game_map.items)
+
+    save = str(tmp_path / "savegame.sav")
+    engine.save_as(save)
+    reloaded = setup_game.load_game(save)
+    assert reloaded.game_world.spawn_tables is not None
+    assert reloaded.game_world.spawn_tables.enemies.sample(reloaded.rng.ai, 1, 1)[0].name == "Marvin"
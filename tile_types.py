@@ -53,4 +53,7 @@ down_stairs = new_tile(
     transparent=True,
     dark=(ord(">"), (100, 0, 0), (150, 50, 50)),
     light=(ord(">"), (255, 255, 255), (200, 180, 50)),
-)
\ No newline at end of file
+)
+
+# Every tile type, floor corpora store the index of a tile in this array (see corpus.py).
+TILE_TYPES = np.array([wall, floor, down_stairs], dtype=tile_dt)